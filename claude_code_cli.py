@@ -6,12 +6,120 @@ import os
 import subprocess
 import tempfile
 import logging
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# RAM-backed scratch space for clones; only used if it has this much free
+SHM_DIR = '/dev/shm'
+SHM_MIN_FREE_BYTES = 512 * 1024 * 1024
+
+# Shared keep-alive session for the GitHub API calls below.
+# Retries only cover GET/HEAD/OPTIONS; POST and the PUT merge are never replayed.
+GITHUB_API_TIMEOUT = 30
+
+_session = requests.Session()
+_session.headers.update({'User-Agent': 'omi-github-app'})
+_session.mount('https://', HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=10,
+    max_retries=Retry(
+        total=3,
+        backoff_factor=0.3,
+        status_forcelist=[502, 503, 504],
+        allowed_methods=frozenset({"GET", "HEAD", "OPTIONS"})
+    )
+))
+
+
+def get_tmp_root() -> Optional[str]:
+    """
+    Pick the parent directory for throwaway clones.
+
+    CLAUDE_TMPDIR wins if set; otherwise /dev/shm when it exists and has room,
+    so clone and working-tree writes stay in RAM. None falls back to the
+    system default temp dir.
+    """
+    override = os.getenv('CLAUDE_TMPDIR')
+    if override:
+        return override
+
+    try:
+        stats = os.statvfs(SHM_DIR)
+    except OSError:
+        return None
+
+    if stats.f_bavail * stats.f_frsize >= SHM_MIN_FREE_BYTES and os.access(SHM_DIR, os.W_OK):
+        return SHM_DIR
+    return None
+
+
+def read_head_branch(repo_dir: str) -> Optional[str]:
+    """
+    Return the branch a checkout's HEAD points at, read straight from .git/HEAD.
+
+    Avoids forking git (and the network round trip of `git remote show origin`)
+    just to learn the default branch of a fresh clone.
+    """
+    try:
+        with open(os.path.join(repo_dir, '.git', 'HEAD'), 'r') as f:
+            head = f.read().strip()
+    except OSError:
+        return None
+
+    prefix = 'ref: refs/heads/'
+    return head[len(prefix):] if head.startswith(prefix) else None
+
+
+def parse_porcelain_v2_paths(status_output: str) -> List[str]:
+    """
+    Extract the changed paths from `git status --porcelain=v2 -z` output.
+
+    Renames/copies contribute both the new and the original path so that
+    staging them also records the removal of the old name.
+    """
+    paths = []
+    fields = iter(status_output.split('\0'))
+    for entry in fields:
+        if not entry:
+            continue
+        kind = entry[0]
+        if kind == '1':
+            paths.append(entry.split(' ', 8)[8])
+        elif kind == '2':
+            paths.append(entry.split(' ', 9)[9])
+            orig_path = next(fields, '')
+            if orig_path:
+                paths.append(orig_path)
+        elif kind == 'u':
+            paths.append(entry.split(' ', 10)[10])
+        elif kind == '?':
+            paths.append(entry[2:])
+    return paths
+
+
+def stage_paths(repo_dir: str, paths: List[str]) -> None:
+    """
+    Stage exactly the given paths (adds, edits and deletions).
+
+    Feeding the pathspec over stdin keeps git from re-scanning the whole
+    worktree and avoids argv length limits on large changesets. The paths
+    are exact porcelain output, so they are matched literally: a name like
+    app/[id]/page.tsx must not act as a glob.
+    """
+    subprocess.run(
+        ['git', '--literal-pathspecs', 'add', '-A', '--pathspec-from-file=-', '--pathspec-file-nul'],
+        cwd=repo_dir,
+        input='\0'.join(paths),
+        text=True,
+        check=True
+    )
+
 
 def run_claude_code_on_repo(
     repo_url: str,
@@ -35,13 +143,14 @@ def run_claude_code_on_repo(
     """
     try:
         # Create temp directory for repo
-        with tempfile.TemporaryDirectory() as tmpdir:
-            logger.info(f"Cloning {repo_url} to {tmpdir}")
+        with tempfile.TemporaryDirectory(dir=get_tmp_root()) as tmpdir:
+            logger.info("Cloning %s to %s", repo_url, tmpdir)
 
-            # Clone repo with auth
+            # Shallow, single-branch clone: only the default branch tip is
+            # needed, so skip history, other branches and tags.
             auth_url = repo_url.replace('https://', f'https://{github_token}@')
             clone_result = subprocess.run(
-                ['git', 'clone', auth_url, tmpdir],
+                ['git', 'clone', '--depth=1', '--single-branch', '--no-tags', auth_url, tmpdir],
                 capture_output=True,
                 text=True,
                 timeout=60
@@ -53,7 +162,11 @@ def run_claude_code_on_repo(
                     'message': f'Failed to clone repo: {clone_result.stderr}'
                 }
 
-            logger.info(f"Cloned successfully, creating branch {branch_name}")
+            logger.info("Cloned successfully, creating branch %s", branch_name)
+
+            # The fresh clone's HEAD is the remote default branch; read it before branching
+            default_branch = read_head_branch(tmpdir) or 'main'
+            logger.info("Default branch: %s", default_branch)
 
             # Create new branch
             subprocess.run(
@@ -63,7 +176,7 @@ def run_claude_code_on_repo(
             )
 
             # Run Claude Code CLI
-            logger.info(f"Running Claude Code: {feature_description}")
+            logger.info("Running Claude Code: %s", feature_description)
 
             # Set environment for Claude Code
             env = os.environ.copy()
@@ -93,62 +206,44 @@ def run_claude_code_on_repo(
                     timeout=300  # 5 minute timeout
                 )
 
-                logger.info(f"Claude Code output:\n{result.stdout}")
+                logger.info("Claude Code output:\n%s", result.stdout)
 
                 if result.returncode != 0:
-                    logger.error(f"Claude Code error:\n{result.stderr}")
+                    logger.error("Claude Code error:\n%s", result.stderr)
 
             except subprocess.TimeoutExpired:
                 logger.warning("Claude Code timed out after 5 minutes")
 
-            # Check if there are changes to commit
+            # One porcelain status call tells us whether anything is left to commit
             status_result = subprocess.run(
-                ['git', 'status', '--porcelain'],
+                ['git', 'status', '--porcelain=v2', '-z', '--untracked-files=all'],
                 cwd=tmpdir,
                 capture_output=True,
                 text=True
             )
 
-            has_changes = bool(status_result.stdout.strip())
-
-            if has_changes:
-                # Stage all changes
-                subprocess.run(['git', 'add', '-A'], cwd=tmpdir, check=True)
+            changed_paths = parse_porcelain_v2_paths(status_result.stdout)
+            if changed_paths:
+                # Stage and commit whatever Claude Code left uncommitted
+                stage_paths(tmpdir, changed_paths)
 
-                # Commit if not already committed
-                commit_check = subprocess.run(
-                    ['git', 'diff', '--cached', '--quiet'],
-                    cwd=tmpdir
+                logger.info("Committing changes...")
+                commit_result = subprocess.run(
+                    ['git', 'commit', '-m', f'feat: {feature_description}\n\nGenerated by Claude Code via Omi'],
+                    cwd=tmpdir,
+                    capture_output=True,
+                    text=True
                 )
-
-                if commit_check.returncode != 0:  # Has staged changes
-                    logger.info("Committing changes...")
-                    subprocess.run(
-                        ['git', 'commit', '-m', f'feat: {feature_description}\n\nGenerated by Claude Code via Omi'],
-                        cwd=tmpdir,
-                        check=True
-                    )
-
-            # Get default branch for PR
-            default_branch_result = subprocess.run(
-                ['git', 'remote', 'show', 'origin'],
-                cwd=tmpdir,
-                capture_output=True,
-                text=True
-            )
-
-            default_branch = 'main'
-            for line in default_branch_result.stdout.split('\n'):
-                if 'HEAD branch:' in line:
-                    default_branch = line.split(':')[1].strip()
-                    break
-
-            logger.info(f"Default branch: {default_branch}")
+                if commit_result.returncode != 0:
+                    return {
+                        'success': False,
+                        'message': f'Failed to commit changes: {commit_result.stderr or commit_result.stdout}'
+                    }
 
             # Push to remote
-            logger.info(f"Pushing branch {branch_name} to remote...")
+            logger.info("Pushing branch %s to remote...", branch_name)
             push_result = subprocess.run(
-                ['git', 'push', 'origin', branch_name],
+                ['git', 'push', '--atomic', '--no-verify', 'origin', f'{branch_name}:refs/heads/{branch_name}'],
                 cwd=tmpdir,
                 capture_output=True,
                 text=True
@@ -160,7 +255,7 @@ def run_claude_code_on_repo(
                     'message': f'Failed to push: {push_result.stderr}'
                 }
 
-            logger.info(f"Successfully pushed to branch {branch_name}")
+            logger.info("Successfully pushed to branch %s", branch_name)
 
             return {
                 'success': True,
@@ -170,7 +265,7 @@ def run_claude_code_on_repo(
             }
 
     except Exception as e:
-        logger.error(f"Error running Claude Code: {e}", exc_info=True)
+        logger.error("Error running Claude Code: %s", e, exc_info=True)
         return {
             'success': False,
             'message': f'Failed to run Claude Code: {str(e)}'
@@ -189,8 +284,6 @@ def get_default_branch(owner: str, repo: str, github_token: str) -> str:
     Returns:
         Default branch name (e.g., 'main', 'master', 'flutterflow')
     """
-    import requests
-
     url = f'https://api.github.com/repos/{owner}/{repo}'
     headers = {
         'Authorization': f'token {github_token}',
@@ -198,13 +291,13 @@ def get_default_branch(owner: str, repo: str, github_token: str) -> str:
     }
 
     try:
-        response = requests.get(url, headers=headers)
+        response = _session.get(url, headers=headers, timeout=GITHUB_API_TIMEOUT)
         if response.status_code == 200:
             default_branch = response.json().get('default_branch', 'main')
-            logger.info(f"Default branch for {owner}/{repo}: {default_branch}")
+            logger.info("Default branch for %s/%s: %s", owner, repo, default_branch)
             return default_branch
     except Exception as e:
-        logger.error(f"Failed to get default branch: {e}")
+        logger.error("Failed to get default branch: %s", e)
 
     # Fallback to 'main'
     return 'main'
@@ -234,8 +327,6 @@ def create_pr_with_github_api(
     Returns:
         Dict with pr_url and pr_number if successful, None otherwise
     """
-    import requests
-
     url = f'https://api.github.com/repos/{owner}/{repo}/pulls'
     headers = {
         'Authorization': f'token {github_token}',
@@ -248,16 +339,16 @@ def create_pr_with_github_api(
         'base': base_branch
     }
 
-    logger.info(f"Creating PR: {branch} -> {base_branch}")
+    logger.info("Creating PR: %s -> %s", branch, base_branch)
 
     try:
-        response = requests.post(url, headers=headers, json=data)
+        response = _session.post(url, headers=headers, json=data, timeout=GITHUB_API_TIMEOUT)
 
         if response.status_code == 201:
             pr_data = response.json()
             pr_url = pr_data.get('html_url')
             pr_number = pr_data.get('number')
-            logger.info(f"PR created successfully: {pr_url}")
+            logger.info("PR created successfully: %s", pr_url)
             return {
                 'pr_url': pr_url,
                 'pr_number': pr_number
@@ -267,7 +358,7 @@ def create_pr_with_github_api(
             logger.error(error_msg)
             return None
     except Exception as e:
-        logger.error(f"Exception creating PR: {e}", exc_info=True)
+        logger.error("Exception creating PR: %s", e, exc_info=True)
         return None
 
 
@@ -291,8 +382,6 @@ def merge_pr_with_github_api(
     Returns:
         True if merged successfully, False otherwise
     """
-    import requests
-
     url = f'https://api.github.com/repos/{owner}/{repo}/pulls/{pr_number}/merge'
     headers = {
         'Authorization': f'token {github_token}',
@@ -302,18 +391,18 @@ def merge_pr_with_github_api(
         'merge_method': merge_method
     }
 
-    logger.info(f"Merging PR #{pr_number} using {merge_method} method")
+    logger.info("Merging PR #%s using %s method", pr_number, merge_method)
 
     try:
-        response = requests.put(url, headers=headers, json=data)
+        response = _session.put(url, headers=headers, json=data, timeout=GITHUB_API_TIMEOUT)
 
         if response.status_code == 200:
-            logger.info(f"PR #{pr_number} merged successfully")
+            logger.info("PR #%s merged successfully", pr_number)
             return True
         else:
             error_msg = f"Failed to merge PR: {response.status_code} - {response.text}"
             logger.error(error_msg)
             return False
     except Exception as e:
-        logger.error(f"Exception merging PR: {e}", exc_info=True)
+        logger.error("Exception merging PR: %s", e, exc_info=True)
         return False
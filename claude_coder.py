@@ -2,34 +2,67 @@
 Claude Code integration - AI-powered coding using Anthropic API.
 Uses GitHub API directly (no git binary required).
 """
-import os
 import re
-import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from typing import Optional, Dict, Any, List, Tuple
+import httpx
 from anthropic import Anthropic
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import logging
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Shared keep-alive session for GitHub API calls (reuses TCP/TLS connections).
+# Retries only cover GET/HEAD/OPTIONS; POST/PATCH and the PUT merge are never replayed.
+GITHUB_API_TIMEOUT = 30
+
+_session = requests.Session()
+_session.headers.update({'User-Agent': 'omi-github-app'})
+_session.mount('https://', HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=10,
+    max_retries=Retry(
+        total=3,
+        backoff_factor=0.3,
+        status_forcelist=[502, 503, 504],
+        allowed_methods=frozenset({"GET", "HEAD", "OPTIONS"})
+    )
+))
 
-def generate_code_with_claude(feature_description: str, repo_context: str, anthropic_key: str) -> str:
-    """
-    Generate code using Claude API.
+# Default branches rarely change: cache per repo as (expires_at, branch, etag)
+DEFAULT_BRANCH_CACHE_TTL = 3600
+_default_branch_cache: Dict[Tuple[str, str], Tuple[float, str, Optional[str]]] = {}
 
-    Args:
-        feature_description: What the user wants to implement
-        repo_context: Context about the repository (structure, files, etc.)
-        anthropic_key: User's Anthropic API key
+# GitHub comfortably handles ~10 concurrent blob creates per token
+BLOB_UPLOAD_CONCURRENCY = 10
+# Files up to this size ride along in the tree request instead of a blob POST
+INLINE_CONTENT_MAX_CHARS = 100_000
+# Upper bound on the repo listing embedded in the code-generation prompt
+REPO_CONTEXT_MAX_BYTES = 8000
 
-    Returns:
-        Generated code/changes as a string
-    """
-    client = Anthropic(api_key=anthropic_key)
+CLAUDE_MODEL = "claude-sonnet-4-20250514"
+CLAUDE_MAX_TOKENS = 8000
+CLAUDE_TIMEOUT = httpx.Timeout(60.0, connect=5.0)
+
+# Matches: FILE: path/to/file.ext followed by ```lang\ncode\n```
+_FILE_BLOCK_RE = re.compile(r'FILE:[ \t]*([^\n]+?)[ \t]*\n\s*```[^\n]*\n(.*?)```', re.DOTALL)
+
+
+@lru_cache(maxsize=64)
+def _get_client(anthropic_key: str) -> Anthropic:
+    """Return a shared Anthropic client per API key so its connection pool stays warm."""
+    return Anthropic(api_key=anthropic_key, max_retries=2, timeout=CLAUDE_TIMEOUT)
 
-    prompt = f"""You are an expert software engineer. Generate code to implement the following feature:
+
+def _build_code_prompt(feature_description: str, repo_context: str) -> str:
+    """Build the code-generation prompt for a single feature request."""
+    return f"""You are an expert software engineer. Generate code to implement the following feature:
 
 Feature Request: {feature_description}
 
@@ -55,10 +88,26 @@ Be specific about which files to create or modify. Include the full file content
 If the feature is very simple (like adding a test file), just create that one file without overthinking it.
 """
 
-    logger.info(f"Generating code with Claude for: {feature_description}")
+
+def generate_code_with_claude(feature_description: str, repo_context: str, anthropic_key: str) -> str:
+    """
+    Generate code using Claude API.
+
+    Args:
+        feature_description: What the user wants to implement
+        repo_context: Context about the repository (structure, files, etc.)
+        anthropic_key: User's Anthropic API key
+
+    Returns:
+        Generated code/changes as a string
+    """
+    client = _get_client(anthropic_key)
+    prompt = _build_code_prompt(feature_description, repo_context)
+
+    logger.info("Generating code with Claude for: %s", feature_description)
     message = client.messages.create(
-        model="claude-sonnet-4-20250514",
-        max_tokens=8000,
+        model=CLAUDE_MODEL,
+        max_tokens=CLAUDE_MAX_TOKENS,
         messages=[{"role": "user", "content": prompt}]
     )
 
@@ -77,16 +126,11 @@ def parse_code_changes(changes: str) -> List[Tuple[str, str]]:
     """
     files = []
 
-    # Pattern to match: FILE: path/to/file.ext followed by ```lang\ncode\n```
-    pattern = r'FILE:\s*([^\n]+)\s*```(?:\w+)?\s*\n(.*?)```'
-
-    matches = re.finditer(pattern, changes, re.DOTALL)
-
-    for match in matches:
+    for match in _FILE_BLOCK_RE.finditer(changes):
         file_path = match.group(1).strip()
         file_content = match.group(2)
         files.append((file_path, file_content))
-        logger.info(f"Parsed file: {file_path} ({len(file_content)} chars)")
+        logger.info("Parsed file: %s (%d chars)", file_path, len(file_content))
 
     # If no structured format found, create a simple change file
     if not files:
@@ -108,66 +152,154 @@ def get_default_branch(owner: str, repo: str, github_token: str) -> str:
     Returns:
         Default branch name (e.g., 'main', 'master', 'flutterflow')
     """
+    key = (owner.lower(), repo.lower())
+    cached = _default_branch_cache.get(key)
+    if cached and cached[0] > time.monotonic():
+        return cached[1]
+
     url = f'https://api.github.com/repos/{owner}/{repo}'
     headers = {
         'Authorization': f'token {github_token}',
         'Accept': 'application/vnd.github.v3+json'
     }
+    if cached and cached[2]:
+        # Revalidate: a 304 is cheap and does not count against the rate limit
+        headers['If-None-Match'] = cached[2]
 
     try:
-        response = requests.get(url, headers=headers)
+        response = _session.get(url, headers=headers, timeout=GITHUB_API_TIMEOUT)
+        if response.status_code == 304 and cached:
+            _default_branch_cache[key] = (time.monotonic() + DEFAULT_BRANCH_CACHE_TTL, cached[1], cached[2])
+            return cached[1]
         if response.status_code == 200:
             default_branch = response.json().get('default_branch', 'main')
-            logger.info(f"Default branch for {owner}/{repo}: {default_branch}")
+            logger.info("Default branch for %s/%s: %s", owner, repo, default_branch)
+            _default_branch_cache[key] = (
+                time.monotonic() + DEFAULT_BRANCH_CACHE_TTL,
+                default_branch,
+                response.headers.get('ETag')
+            )
             return default_branch
+        if response.status_code == 404:
+            _default_branch_cache.pop(key, None)
     except Exception as e:
-        logger.error(f"Failed to get default branch: {e}")
+        logger.error("Failed to get default branch: %s", e)
 
     # Fallback to 'main'
     return 'main'
 
 
-def get_repo_context_via_api(owner: str, repo: str, github_token: str, path: str = "") -> str:
+def get_repo_context_via_api(
+    owner: str,
+    repo: str,
+    github_token: str,
+    path: str = "",
+    max_files: int = 500,
+    max_bytes: int = REPO_CONTEXT_MAX_BYTES,
+    ref: Optional[str] = None
+) -> str:
     """
     Get repository context via GitHub API (no git clone needed).
 
+    Fetches the recursive tree of `ref` in a single request. Only tree
+    metadata is transferred - no file contents - so this is the API
+    equivalent of a blobless partial clone. The listing is a compact,
+    sorted list of paths (one per line, directories suffixed with '/')
+    relative to `path`.
+
     Args:
         owner: Repository owner
         repo: Repository name
         github_token: GitHub access token
         path: Path within repo to explore (default: root)
+        max_files: Maximum number of entries to list
+        max_bytes: Hard cap on the UTF-8 size of the returned listing
+        ref: Branch or commit to list (default: HEAD, i.e. the default branch)
 
     Returns:
         String describing the repo structure
     """
-    url = f'https://api.github.com/repos/{owner}/{repo}/contents/{path}'
+    ref = ref or 'HEAD'
+    url = f'https://api.github.com/repos/{owner}/{repo}/git/trees/{ref}'
     headers = {
         'Authorization': f'token {github_token}',
         'Accept': 'application/vnd.github.v3+json'
     }
 
     try:
-        response = requests.get(url, headers=headers)
+        response = _session.get(url, headers=headers, params={'recursive': '1'}, timeout=GITHUB_API_TIMEOUT)
         if response.status_code == 200:
-            items = response.json()
+            data = response.json()
+
+            prefix = f"{path.strip('/')}/" if path.strip('/') else ''
+            paths = sorted(
+                f"{item['path'][len(prefix):]}/" if item['type'] == 'tree' else item['path'][len(prefix):]
+                for item in data.get('tree', [])
+                if item['type'] in ('blob', 'tree') and item['path'].startswith(prefix)
+            )
+            listing = '\n'.join(paths[:max_files])
+            encoded = listing.encode('utf-8')
+            if len(encoded) > max_bytes:
+                # Cut on a line boundary so no path is truncated mid-name
+                listing = encoded[:encoded.rfind(b'\n', 0, max_bytes) + 1].decode('utf-8').rstrip('\n')
+            if data.get('truncated'):
+                logger.warning("Tree for %s/%s@%s was truncated by GitHub", owner, repo, ref)
+
+            return f"Repository files{f' under {path}' if path else ''}:\n{listing}"
+    except Exception as e:
+        logger.error("Failed to get repo context: %s", e)
 
-            context = ["Repository Structure:"]
+    return "Repository: Unable to fetch structure"
 
-            # List directories and files
-            for item in items[:20]:  # Limit to 20 items
-                if item['type'] == 'dir':
-                    context.append(f"  📁 {item['name']}/")
-                else:
-                    context.append(f"  📄 {item['name']}")
 
-            if len(items) > 20:
-                context.append(f"  ... and {len(items) - 20} more items")
+def _create_blob(owner: str, repo: str, file_path: str, content: str, headers: Dict[str, str]) -> Optional[str]:
+    """Create a single blob and return its SHA, or None on failure."""
+    blob_url = f'https://api.github.com/repos/{owner}/{repo}/git/blobs'
+    blob_data = {
+        'content': content,
+        'encoding': 'utf-8'
+    }
 
-            return '\n'.join(context)
-    except Exception as e:
-        logger.error(f"Failed to get repo context: {e}")
+    response = _session.post(blob_url, headers=headers, json=blob_data, timeout=GITHUB_API_TIMEOUT)
 
-    return "Repository: Unable to fetch structure"
+    if response.status_code != 201:
+        logger.error("Failed to create blob for %s: %s", file_path, response.text)
+        return None
+
+    blob_sha = response.json()['sha']
+    logger.info("Created blob for %s: %s", file_path, blob_sha)
+    return blob_sha
+
+
+def _get_base_commit(
+    owner: str,
+    repo: str,
+    base_branch: str,
+    headers: Dict[str, str]
+) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+    """
+    Look up the tip commit of base_branch and its tree.
+
+    The REST commits endpoint resolves a branch name directly and includes
+    the tree SHA, so this is one request instead of ref + git/commits. The
+    commit's file list is paginated down to one entry since only the SHAs
+    are needed.
+
+    Returns:
+        (base_sha, base_tree_sha, None) on success, (None, None, error message) otherwise
+    """
+    logger.info("Getting tip commit of base branch: %s", base_branch)
+    commit_url = f'https://api.github.com/repos/{owner}/{repo}/commits/{base_branch}'
+    response = _session.get(commit_url, headers=headers, params={'per_page': 1}, timeout=GITHUB_API_TIMEOUT)
+
+    if response.status_code != 200:
+        return None, None, f'Failed to get base branch: {response.text}'
+
+    data = response.json()
+    base_sha = data['sha']
+    base_tree_sha = data['commit']['tree']['sha']
+    logger.info("Base branch SHA: %s, tree SHA: %s", base_sha, base_tree_sha)
+    return base_sha, base_tree_sha, None
 
 
 def create_or_update_files_via_api(
@@ -200,61 +332,37 @@ def create_or_update_files_via_api(
     }
 
     try:
-        # Step 1: Get the base branch reference
-        logger.info(f"Getting reference for base branch: {base_branch}")
-        ref_url = f'https://api.github.com/repos/{owner}/{repo}/git/ref/heads/{base_branch}'
-        response = requests.get(ref_url, headers=headers)
-
-        if response.status_code != 200:
+        # Steps 1-2: Get the base branch's commit and tree
+        base_sha, base_tree_sha, error = _get_base_commit(owner, repo, base_branch, headers)
+        if error:
             return {
                 'success': False,
-                'message': f'Failed to get base branch: {response.text}'
+                'message': error
             }
 
-        base_sha = response.json()['object']['sha']
-        logger.info(f"Base branch SHA: {base_sha}")
-
-        # Step 2: Get the base tree
-        logger.info(f"Getting base tree...")
-        commit_url = f'https://api.github.com/repos/{owner}/{repo}/git/commits/{base_sha}'
-        response = requests.get(commit_url, headers=headers)
-
-        if response.status_code != 200:
-            return {
-                'success': False,
-                'message': f'Failed to get base commit: {response.text}'
-            }
-
-        base_tree_sha = response.json()['tree']['sha']
-        logger.info(f"Base tree SHA: {base_tree_sha}")
-
-        # Step 3: Create blobs for each file
-        logger.info(f"Creating blobs for {len(files)} files...")
+        # Step 3: Build tree entries. Small files are sent inline with the tree
+        # request (GitHub creates the blob server-side); only large files get
+        # their own blob upload, and those run concurrently.
         tree_items = []
+        pending_blobs = []
+        with ThreadPoolExecutor(max_workers=BLOB_UPLOAD_CONCURRENCY) as executor:
+            for file_path, content in files:
+                item = {
+                    'path': file_path,
+                    'mode': '100644',  # Regular file
+                    'type': 'blob'
+                }
+                if len(content) > INLINE_CONTENT_MAX_CHARS:
+                    pending_blobs.append((item, executor.submit(_create_blob, owner, repo, file_path, content, headers)))
+                else:
+                    item['content'] = content
+                tree_items.append(item)
 
-        for file_path, content in files:
-            # Create blob
-            blob_url = f'https://api.github.com/repos/{owner}/{repo}/git/blobs'
-            blob_data = {
-                'content': content,
-                'encoding': 'utf-8'
-            }
-
-            response = requests.post(blob_url, headers=headers, json=blob_data)
-
-            if response.status_code != 201:
-                logger.error(f"Failed to create blob for {file_path}: {response.text}")
-                continue
-
-            blob_sha = response.json()['sha']
-            logger.info(f"Created blob for {file_path}: {blob_sha}")
+            for item, future in pending_blobs:
+                item['sha'] = future.result()
 
-            tree_items.append({
-                'path': file_path,
-                'mode': '100644',  # Regular file
-                'type': 'blob',
-                'sha': blob_sha
-            })
+        logger.info("Prepared %d files (%d uploaded as separate blobs)", len(tree_items), len(pending_blobs))
+        tree_items = [item for item in tree_items if item.get('content') is not None or item.get('sha')]
 
         if not tree_items:
             return {
@@ -263,14 +371,14 @@ def create_or_update_files_via_api(
             }
 
         # Step 4: Create a new tree
-        logger.info(f"Creating new tree with {len(tree_items)} items...")
+        logger.info("Creating new tree with %d items...", len(tree_items))
         tree_url = f'https://api.github.com/repos/{owner}/{repo}/git/trees'
         tree_data = {
             'base_tree': base_tree_sha,
             'tree': tree_items
         }
 
-        response = requests.post(tree_url, headers=headers, json=tree_data)
+        response = _session.post(tree_url, headers=headers, json=tree_data, timeout=GITHUB_API_TIMEOUT)
 
         if response.status_code != 201:
             return {
@@ -279,10 +387,10 @@ def create_or_update_files_via_api(
             }
 
         new_tree_sha = response.json()['sha']
-        logger.info(f"New tree SHA: {new_tree_sha}")
+        logger.info("New tree SHA: %s", new_tree_sha)
 
         # Step 5: Create a commit
-        logger.info(f"Creating commit...")
+        logger.info("Creating commit...")
         commit_url = f'https://api.github.com/repos/{owner}/{repo}/git/commits'
         commit_data = {
             'message': commit_message,
@@ -290,7 +398,7 @@ def create_or_update_files_via_api(
             'parents': [base_sha]
         }
 
-        response = requests.post(commit_url, headers=headers, json=commit_data)
+        response = _session.post(commit_url, headers=headers, json=commit_data, timeout=GITHUB_API_TIMEOUT)
 
         if response.status_code != 201:
             return {
@@ -299,25 +407,38 @@ def create_or_update_files_via_api(
             }
 
         new_commit_sha = response.json()['sha']
-        logger.info(f"New commit SHA: {new_commit_sha}")
+        logger.info("New commit SHA: %s", new_commit_sha)
 
         # Step 6: Create/update the branch reference
-        logger.info(f"Creating branch: {branch_name}")
+        logger.info("Creating branch: %s", branch_name)
         ref_url = f'https://api.github.com/repos/{owner}/{repo}/git/refs'
         ref_data = {
             'ref': f'refs/heads/{branch_name}',
             'sha': new_commit_sha
         }
 
-        response = requests.post(ref_url, headers=headers, json=ref_data)
-
-        if response.status_code not in [201, 422]:  # 422 means already exists
+        response = _session.post(ref_url, headers=headers, json=ref_data, timeout=GITHUB_API_TIMEOUT)
+
+        if response.status_code == 422:  # Branch already exists - fast-forward it only
+            logger.info("Branch %s exists, updating reference", branch_name)
+            response = _session.patch(
+                f'{ref_url}/heads/{branch_name}',
+                headers=headers,
+                json={'sha': new_commit_sha},
+                timeout=GITHUB_API_TIMEOUT
+            )
+            if response.status_code != 200:
+                return {
+                    'success': False,
+                    'message': f'Failed to update existing branch {branch_name} (not a fast-forward?): {response.text}'
+                }
+        elif response.status_code != 201:
             return {
                 'success': False,
                 'message': f'Failed to create branch: {response.text}'
             }
 
-        logger.info(f"Branch {branch_name} created successfully!")
+        logger.info("Branch %s created successfully!", branch_name)
 
         return {
             'success': True,
@@ -327,7 +448,7 @@ def create_or_update_files_via_api(
         }
 
     except Exception as e:
-        logger.error(f"Error creating branch via API: {e}", exc_info=True)
+        logger.error("Error creating branch via API: %s", e, exc_info=True)
         return {
             'success': False,
             'message': f'Failed to create branch: {str(e)}'
@@ -370,16 +491,16 @@ def create_pr_with_github_api(
         'base': base_branch
     }
 
-    logger.info(f"Creating PR: {branch} -> {base_branch}")
+    logger.info("Creating PR: %s -> %s", branch, base_branch)
 
     try:
-        response = requests.post(url, headers=headers, json=data)
+        response = _session.post(url, headers=headers, json=data, timeout=GITHUB_API_TIMEOUT)
 
         if response.status_code == 201:
             pr_data = response.json()
             pr_url = pr_data.get('html_url')
             pr_number = pr_data.get('number')
-            logger.info(f"PR created successfully: {pr_url}")
+            logger.info("PR created successfully: %s", pr_url)
             return {
                 'pr_url': pr_url,
                 'pr_number': pr_number
@@ -389,7 +510,7 @@ def create_pr_with_github_api(
             logger.error(error_msg)
             return None
     except Exception as e:
-        logger.error(f"Exception creating PR: {e}", exc_info=True)
+        logger.error("Exception creating PR: %s", e, exc_info=True)
         return None
 
 
@@ -422,18 +543,18 @@ def merge_pr_with_github_api(
         'merge_method': merge_method
     }
 
-    logger.info(f"Merging PR #{pr_number} using {merge_method} method")
+    logger.info("Merging PR #%s using %s method", pr_number, merge_method)
 
     try:
-        response = requests.put(url, headers=headers, json=data)
+        response = _session.put(url, headers=headers, json=data, timeout=GITHUB_API_TIMEOUT)
 
         if response.status_code == 200:
-            logger.info(f"PR #{pr_number} merged successfully")
+            logger.info("PR #%s merged successfully", pr_number)
             return True
         else:
             error_msg = f"Failed to merge PR: {response.status_code} - {response.text}"
             logger.error(error_msg)
             return False
     except Exception as e:
-        logger.error(f"Exception merging PR: {e}", exc_info=True)
+        logger.error("Exception merging PR: %s", e, exc_info=True)
         return False
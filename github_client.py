@@ -1,9 +1,65 @@
+import asyncio
+import logging
 import os
-import requests
-from typing import Optional, List, Dict
-from dotenv import load_dotenv
-
-load_dotenv()
+import random
+import time
+from typing import Any, Callable, Optional, List, Dict, Tuple
+
+import httpx
+
+from ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Repo labels change rarely: serve cached lists for this long (seconds) before
+# revalidating them with the stored ETag
+LABELS_CACHE_TTL = 600
+# How long conditional-GET entries (ETag + parsed body) are kept for revalidation
+ETAG_CACHE_TTL = 86400
+
+# Max GitHub requests in flight across all endpoints
+GITHUB_MAX_CONCURRENCY = int(os.getenv("OMI_GITHUB_CONCURRENCY", "20"))
+# When a token's hourly budget is spent, wait for the reset only if it is this close (seconds)
+RATE_LIMIT_MAX_WAIT = 10
+
+# GitHub OAuth tokens don't expire or refresh; a 401 means the user revoked
+# the app, so further calls with that token are answered locally for this long
+REVOKED_TOKEN_TTL = 3600
+
+# Retry policy: exponential backoff from 1s with jitter, 3 retries.
+# 5xx and dropped connections are only retried for idempotent methods, so a
+# POST that may have reached GitHub (e.g. create_issue) is never duplicated;
+# rate-limit rejections are safe to retry for every method.
+GITHUB_MAX_RETRIES = 3
+RETRY_BASE_DELAY = 1.0
+RETRY_JITTER = 0.5
+_IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS"}
+_RETRYABLE_STATUSES = {500, 502, 503, 504}
+
+_ISSUE_STATES = {
+    "open": ["OPEN"],
+    "closed": ["CLOSED"],
+    "all": ["OPEN", "CLOSED"]
+}
+
+_LIST_ISSUES_QUERY = """
+query($owner: String!, $name: String!, $states: [IssueState!], $first: Int!, $after: String) {
+  repository(owner: $owner, name: $name) {
+    issues(first: $first, after: $after, states: $states, orderBy: {field: CREATED_AT, direction: DESC}) {
+      pageInfo { endCursor hasNextPage }
+      nodes {
+        number
+        title
+        state
+        url
+        createdAt
+        author { login }
+        labels(first: 10) { nodes { name } }
+      }
+    }
+  }
+}
+"""
 
 
 class GitHubClient:
@@ -13,6 +69,197 @@ class GitHubClient:
         self.client_id = os.getenv("GITHUB_CLIENT_ID")
         self.client_secret = os.getenv("GITHUB_CLIENT_SECRET")
         self.api_base = "https://api.github.com"
+        # (access_token, url, params) -> (fresh_until, etag, parsed body)
+        self._etag_cache = TTLCache(maxsize=2048, ttl=ETAG_CACHE_TTL)
+        # Shared keep-alive connection pool, created on first use inside the event loop
+        self._http: Optional[httpx.AsyncClient] = None
+        # Bounds concurrent GitHub calls so bursts don't turn into secondary rate limits
+        self._semaphore = asyncio.Semaphore(GITHUB_MAX_CONCURRENCY)
+        # access_token -> (remaining, reset_epoch) from the last X-RateLimit-* headers
+        self._rate_limits = TTLCache(maxsize=4096, ttl=3600)
+        # access_tokens GitHub has answered 401 for (see REVOKED_TOKEN_TTL)
+        self._revoked_tokens = TTLCache(maxsize=4096, ttl=REVOKED_TOKEN_TTL)
+        # (access_token, repo) -> label fetch currently in flight
+        self._labels_inflight: Dict[Tuple[str, str], asyncio.Future] = {}
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        if self._http is None or self._http.is_closed:
+            self._http = httpx.AsyncClient(
+                timeout=httpx.Timeout(30.0, connect=5.0),
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=75.0),
+                headers={
+                    "Accept": "application/vnd.github.v3+json",
+                    "User-Agent": "omi-github-app"
+                }
+            )
+        return self._http
+
+    async def aclose(self):
+        """Close the shared connection pool (called on app shutdown)."""
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    async def _request(
+        self,
+        method: str,
+        url: str,
+        access_token: Optional[str] = None,
+        **kwargs
+    ) -> httpx.Response:
+        """
+        Send a request on the shared pool, adding the user's token if given.
+
+        Concurrency is capped by a shared semaphore, and each token's remaining
+        budget is tracked from the X-RateLimit-* headers. A token known to be
+        exhausted waits for the reset if it is imminent; otherwise the request
+        goes out and GitHub's own rate-limit error is returned to the caller.
+
+        A token that already got a 401 is short-circuited with a local 401
+        response instead of another round trip.
+        """
+        if access_token and access_token in self._revoked_tokens:
+            return httpx.Response(
+                401,
+                json={"message": "Bad credentials"},
+                request=httpx.Request(method, url)
+            )
+
+        headers = kwargs.pop("headers", None) or {}
+        if access_token:
+            headers["Authorization"] = f"Bearer {access_token}"
+
+        for attempt in range(GITHUB_MAX_RETRIES + 1):
+            if access_token:
+                await self._wait_for_rate_limit(access_token)
+
+            try:
+                async with self._semaphore:
+                    response = await self.http.request(method, url, headers=headers, **kwargs)
+            except httpx.TransportError as e:
+                # A failed connect never reached GitHub, so any method may be resent
+                retryable = method in _IDEMPOTENT_METHODS or isinstance(e, httpx.ConnectError)
+                if not retryable or attempt == GITHUB_MAX_RETRIES:
+                    raise
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+
+            if access_token:
+                if response.status_code == 401:
+                    logger.warning("GitHub rejected the access token (revoked?), skipping further calls with it")
+                    self._revoked_tokens.set(access_token, True)
+                    return response
+                self._track_rate_limit(access_token, response)
+
+            delay = self._retry_delay(method, response, attempt)
+            if delay is None or attempt == GITHUB_MAX_RETRIES:
+                return response
+            logger.warning("GitHub %s on %s %s, retrying in %.1fs", response.status_code, method, url, delay)
+            await asyncio.sleep(delay)
+
+        return response
+
+    def is_token_revoked(self, access_token: str) -> bool:
+        """True if GitHub recently rejected this token with a 401."""
+        return access_token in self._revoked_tokens
+
+    @staticmethod
+    def _backoff(attempt: int) -> float:
+        return RETRY_BASE_DELAY * (2 ** attempt) + random.uniform(0, RETRY_JITTER)
+
+    def _retry_delay(self, method: str, response: httpx.Response, attempt: int) -> Optional[float]:
+        """Seconds to wait before retrying `response`, or None if it should not be retried."""
+        status = response.status_code
+        rate_limited = status == 429 or (
+            status == 403 and (
+                "Retry-After" in response.headers
+                or response.headers.get("X-RateLimit-Remaining") == "0"
+            )
+        )
+
+        if rate_limited:
+            retry_after = response.headers.get("Retry-After")
+            reset = response.headers.get("X-RateLimit-Reset")
+            try:
+                if retry_after is not None:
+                    wait = float(retry_after)
+                elif reset is not None:
+                    wait = max(0.0, int(reset) - time.time())
+                else:
+                    wait = self._backoff(attempt)
+            except ValueError:
+                wait = self._backoff(attempt)
+            # Don't hold the chat request open for a long reset window
+            if wait > RATE_LIMIT_MAX_WAIT:
+                return None
+            return wait + random.uniform(0, RETRY_JITTER)
+
+        if status in _RETRYABLE_STATUSES and method in _IDEMPOTENT_METHODS:
+            return self._backoff(attempt)
+
+        return None
+
+    async def _wait_for_rate_limit(self, access_token: str):
+        limit = self._rate_limits.get(access_token)
+        if not limit or limit[0] > 0:
+            return
+        wait = limit[1] - time.time()
+        if 0 < wait <= RATE_LIMIT_MAX_WAIT:
+            logger.info("GitHub rate limit exhausted, waiting %.1fs for reset", wait)
+            await asyncio.sleep(wait)
+
+    def _track_rate_limit(self, access_token: str, response: httpx.Response):
+        remaining = response.headers.get("X-RateLimit-Remaining")
+        reset = response.headers.get("X-RateLimit-Reset")
+        if remaining is None or reset is None:
+            return
+        try:
+            self._rate_limits.set(access_token, (int(remaining), int(reset)))
+        except ValueError:
+            pass
+
+    async def _conditional_get(
+        self,
+        access_token: str,
+        url: str,
+        transform: Callable[[Any], Any],
+        params: Optional[Dict] = None,
+        fresh_for: float = 0
+    ) -> Tuple[int, Any]:
+        """
+        GET with ETag revalidation, caching `transform(response.json())`.
+
+        Entries younger than `fresh_for` seconds are served without a request.
+        Older ones are revalidated with If-None-Match; a 304 returns the cached
+        value and does not count against the rate limit. 401/404 drop the entry.
+        Returns (status, value); value is None unless status is 200.
+        """
+        cache_key = (access_token, url, tuple(sorted((params or {}).items())))
+        entry = self._etag_cache.get(cache_key)
+        if entry and entry[0] > time.monotonic():
+            return 200, entry[2]
+
+        headers = {}
+        if entry and entry[1]:
+            headers["If-None-Match"] = entry[1]
+
+        response = await self._request("GET", url, access_token, headers=headers, params=params)
+
+        if response.status_code == 304 and entry:
+            self._etag_cache.set(cache_key, (time.monotonic() + fresh_for, entry[1], entry[2]))
+            return 200, entry[2]
+
+        if response.status_code == 200:
+            value = transform(response.json())
+            etag = response.headers.get("ETag")
+            if etag or fresh_for:
+                self._etag_cache.set(cache_key, (time.monotonic() + fresh_for, etag, value))
+            return 200, value
+
+        if response.status_code in (401, 404):
+            self._etag_cache.pop(cache_key)
+        return response.status_code, None
     
     def get_authorization_url(self, redirect_uri: str, state: str) -> str:
         """
@@ -29,13 +276,14 @@ class GitHubClient:
         )
         return auth_url
     
-    def exchange_code_for_token(self, code: str) -> dict:
+    async def exchange_code_for_token(self, code: str) -> dict:
         """
         Exchange authorization code for access token.
         Returns token data including access_token.
         """
         try:
-            response = requests.post(
+            response = await self._request(
+                "POST",
                 "https://github.com/login/oauth/access_token",
                 headers={"Accept": "application/json"},
                 data={
@@ -48,6 +296,8 @@ class GitHubClient:
             if response.status_code == 200:
                 token_data = response.json()
                 if "access_token" in token_data:
+                    # A fresh authorization makes the token usable again
+                    self._revoked_tokens.pop(token_data["access_token"])
                     return token_data
                 else:
                     raise Exception(f"No access token in response: {token_data}")
@@ -55,18 +305,16 @@ class GitHubClient:
                 raise Exception(f"Token exchange failed: {response.status_code} - {response.text}")
                 
         except Exception as e:
-            print(f"❌ Token exchange error: {e}")
+            logger.error("Token exchange error: %s", e)
             raise
     
-    def get_user_info(self, access_token: str) -> dict:
+    async def get_user_info(self, access_token: str) -> dict:
         """Get authenticated user's GitHub info."""
         try:
-            response = requests.get(
+            response = await self._request(
+                "GET",
                 f"{self.api_base}/user",
-                headers={
-                    "Authorization": f"Bearer {access_token}",
-                    "Accept": "application/vnd.github.v3+json"
-                }
+                access_token
             )
             
             if response.status_code == 200:
@@ -75,70 +323,85 @@ class GitHubClient:
                 raise Exception(f"Failed to get user info: {response.status_code}")
                 
         except Exception as e:
-            print(f"❌ Error getting user info: {e}")
+            logger.error("Error getting user info: %s", e)
             raise
     
-    def list_user_repos(self, access_token: str, per_page: int = 100) -> List[Dict]:
+    async def list_user_repos(self, access_token: str, per_page: int = 100) -> List[Dict]:
         """
         List all repositories the user has access to (owned + collaborator).
         Returns list of {name, full_name, owner, private, description}
         """
         try:
-            repos = []
-            
-            # Get user's own repos
-            response = requests.get(
+            # Get user's own repos (revalidated with ETag, so unchanged lists are free)
+            status, repos = await self._conditional_get(
+                access_token,
                 f"{self.api_base}/user/repos",
-                headers={
-                    "Authorization": f"Bearer {access_token}",
-                    "Accept": "application/vnd.github.v3+json"
-                },
-                params={"per_page": per_page, "sort": "updated"}
-            )
-            
-            if response.status_code == 200:
-                user_repos = response.json()
-                for repo in user_repos:
-                    repos.append({
+                lambda user_repos: [
+                    {
                         "name": repo["name"],
                         "full_name": repo["full_name"],
                         "owner": repo["owner"]["login"],
                         "private": repo["private"],
                         "description": repo.get("description", ""),
                         "url": repo["html_url"]
-                    })
-            
-            return repos
+                    }
+                    for repo in user_repos
+                ],
+                params={"per_page": per_page, "sort": "updated"}
+            )
+            return list(repos) if repos else []
             
         except Exception as e:
-            print(f"❌ Error listing repos: {e}")
+            logger.error("Error listing repos: %s", e)
             return []
     
-    def get_repo_labels(self, access_token: str, repo_full_name: str) -> List[str]:
+    async def _fetch_labels(self, access_token: str, repo_full_name: str) -> Optional[List[Dict]]:
         """
-        Fetch all labels from a repository.
-        Returns list of label names.
+        Fetch a repo's labels (name, color, description), cached per token and repo.
+        Returns None if the labels could not be fetched.
+
+        Concurrent calls for the same token and repo share one in-flight request.
         """
+        key = (access_token, repo_full_name.lower())
+        task = self._labels_inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._load_labels(access_token, repo_full_name))
+            self._labels_inflight[key] = task
+            task.add_done_callback(lambda _: self._labels_inflight.pop(key, None))
+        # Shielded so one caller giving up doesn't cancel the fetch for the others
+        return await asyncio.shield(task)
+
+    async def _load_labels(self, access_token: str, repo_full_name: str) -> Optional[List[Dict]]:
         try:
-            response = requests.get(
-                f"{self.api_base}/repos/{repo_full_name}/labels",
-                headers={
-                    "Authorization": f"Bearer {access_token}",
-                    "Accept": "application/vnd.github.v3+json"
-                },
-                params={"per_page": 100}
+            status, labels = await self._conditional_get(
+                access_token,
+                f"{self.api_base}/repos/{repo_full_name.lower()}/labels",
+                lambda data: [
+                    {
+                        "name": label["name"],
+                        "color": label["color"],
+                        "description": label.get("description", "")
+                    }
+                    for label in data
+                ],
+                params={"per_page": 100},
+                fresh_for=LABELS_CACHE_TTL
             )
-            
-            if response.status_code == 200:
-                labels = response.json()
-                return [label["name"] for label in labels]
-            else:
-                print(f"⚠️  Could not fetch labels: {response.status_code}")
-                return []
-                
+            if status != 200:
+                logger.warning("Could not fetch labels: %s", status)
+            return labels
+
         except Exception as e:
-            print(f"⚠️  Error fetching labels: {e}")
-            return []
+            logger.warning("Error fetching labels: %s", e)
+            return None
+
+    async def get_repo_labels(self, access_token: str, repo_full_name: str) -> List[str]:
+        """
+        Fetch all labels from a repository.
+        Returns list of label names.
+        """
+        labels = await self._fetch_labels(access_token, repo_full_name)
+        return [label["name"] for label in labels] if labels else []
     
     async def create_issue(
         self,
@@ -162,12 +425,10 @@ class GitHubClient:
             if labels:
                 issue_data["labels"] = labels
 
-            response = requests.post(
+            response = await self._request(
+                "POST",
                 f"{self.api_base}/repos/{repo_full_name}/issues",
-                headers={
-                    "Authorization": f"Bearer {access_token}",
-                    "Accept": "application/vnd.github.v3+json"
-                },
+                access_token,
                 json=issue_data
             )
 
@@ -181,22 +442,90 @@ class GitHubClient:
                 }
             else:
                 error_msg = response.json().get("message", response.text)
-                print(f"❌ GitHub API error: {response.status_code} - {error_msg}")
+                logger.error("GitHub API error: %s - %s", response.status_code, error_msg)
                 return {
                     "success": False,
                     "error": f"GitHub API error: {error_msg}"
                 }
 
         except Exception as e:
-            print(f"❌ Error creating issue: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Error creating issue: %s", e)
             return {
                 "success": False,
                 "error": str(e)
             }
 
-    def list_issues(
+    async def graphql(self, access_token: str, query: str, variables: Optional[Dict] = None) -> Optional[Dict]:
+        """
+        Run a GitHub GraphQL (v4) query.
+        Returns the `data` object, or None if the request failed.
+        """
+        try:
+            response = await self._request(
+                "POST",
+                f"{self.api_base}/graphql",
+                access_token,
+                json={"query": query, "variables": variables or {}}
+            )
+
+            if response.status_code != 200:
+                logger.error("GraphQL error: %s", response.status_code)
+                return None
+
+            payload = response.json()
+            if payload.get("errors"):
+                logger.warning("GraphQL errors: %s", [err.get('message') for err in payload['errors']])
+            return payload.get("data")
+
+        except Exception as e:
+            logger.error("GraphQL request failed: %s", e)
+            return None
+
+    async def list_issues_page(
+        self,
+        access_token: str,
+        repo_full_name: str,
+        state: str = "open",
+        per_page: int = 10,
+        cursor: Optional[str] = None
+    ) -> Dict:
+        """
+        Fetch one page of issues (newest first), starting after `cursor`.
+        Returns {"issues": [...], "end_cursor": str | None, "has_next_page": bool}.
+
+        Uses GraphQL so only the fields we show are fetched, pull requests
+        never take up slots in the page, and paging is cursor-based.
+        """
+        owner, _, name = repo_full_name.partition("/")
+        data = await self.graphql(access_token, _LIST_ISSUES_QUERY, {
+            "owner": owner,
+            "name": name,
+            "states": _ISSUE_STATES.get(state, _ISSUE_STATES["open"]),
+            "first": per_page,
+            "after": cursor
+        })
+        if not data or not data.get("repository"):
+            return {"issues": [], "end_cursor": None, "has_next_page": False}
+
+        connection = data["repository"]["issues"]
+        return {
+            "issues": [
+                {
+                    "number": issue["number"],
+                    "title": issue["title"],
+                    "state": issue["state"].lower(),
+                    "labels": [label["name"] for label in issue["labels"]["nodes"]],
+                    "url": issue["url"],
+                    "created_at": issue["createdAt"],
+                    "user": issue["author"]["login"] if issue.get("author") else None
+                }
+                for issue in connection["nodes"]
+            ],
+            "end_cursor": connection["pageInfo"]["endCursor"],
+            "has_next_page": connection["pageInfo"]["hasNextPage"]
+        }
+
+    async def list_issues(
         self,
         access_token: str,
         repo_full_name: str,
@@ -204,74 +533,47 @@ class GitHubClient:
         per_page: int = 10
     ) -> List[Dict]:
         """
-        List issues in a repository.
+        List issues in a repository (first page, newest first).
         Returns list of issue dicts.
         """
-        try:
-            response = requests.get(
-                f"{self.api_base}/repos/{repo_full_name}/issues",
-                headers={
-                    "Authorization": f"Bearer {access_token}",
-                    "Accept": "application/vnd.github.v3+json"
-                },
-                params={
-                    "state": state,
-                    "per_page": per_page,
-                    "sort": "created",
-                    "direction": "desc"
-                }
-            )
-
-            if response.status_code == 200:
-                issues = response.json()
-                return [
-                    {
-                        "number": issue["number"],
-                        "title": issue["title"],
-                        "state": issue["state"],
-                        "body": issue.get("body", ""),
-                        "labels": [label["name"] for label in issue.get("labels", [])],
-                        "url": issue["html_url"],
-                        "created_at": issue["created_at"],
-                        "user": issue["user"]["login"] if issue.get("user") else None
-                    }
-                    for issue in issues
-                    if "pull_request" not in issue  # Filter out PRs
-                ]
-            else:
-                print(f"❌ Error listing issues: {response.status_code}")
-                return []
-
-        except Exception as e:
-            print(f"❌ Error listing issues: {e}")
-            return []
+        page = await self.list_issues_page(access_token, repo_full_name, state, per_page)
+        return page["issues"]
 
-    def get_issue(
+    async def get_issue(
         self,
         access_token: str,
         repo_full_name: str,
-        issue_number: int
+        issue_number: int,
+        body_max_chars: Optional[int] = None
     ) -> Optional[Dict]:
         """
         Get details of a specific issue.
         Returns issue dict if successful.
+
+        The body is requested as plain text (text+json media type) rather than
+        raw markdown; if body_max_chars is set it is cut to that length and
+        "body_truncated" tells the caller whether anything was dropped.
         """
         try:
-            response = requests.get(
+            response = await self._request(
+                "GET",
                 f"{self.api_base}/repos/{repo_full_name}/issues/{issue_number}",
-                headers={
-                    "Authorization": f"Bearer {access_token}",
-                    "Accept": "application/vnd.github.v3+json"
-                }
+                access_token,
+                headers={"Accept": "application/vnd.github.text+json"}
             )
 
             if response.status_code == 200:
                 issue = response.json()
+                body = issue.get("body_text") or ""
+                truncated = body_max_chars is not None and len(body) > body_max_chars
+                if truncated:
+                    body = body[:body_max_chars]
                 return {
                     "number": issue["number"],
                     "title": issue["title"],
                     "state": issue["state"],
-                    "body": issue.get("body", ""),
+                    "body": body,
+                    "body_truncated": truncated,
                     "labels": [label["name"] for label in issue.get("labels", [])],
                     "url": issue["html_url"],
                     "created_at": issue["created_at"],
@@ -283,14 +585,14 @@ class GitHubClient:
             elif response.status_code == 404:
                 return None
             else:
-                print(f"❌ Error getting issue: {response.status_code}")
+                logger.error("Error getting issue: %s", response.status_code)
                 return None
 
         except Exception as e:
-            print(f"❌ Error getting issue: {e}")
+            logger.error("Error getting issue: %s", e)
             return None
 
-    def add_issue_comment(
+    async def add_issue_comment(
         self,
         access_token: str,
         repo_full_name: str,
@@ -302,12 +604,10 @@ class GitHubClient:
         Returns comment data if successful.
         """
         try:
-            response = requests.post(
+            response = await self._request(
+                "POST",
                 f"{self.api_base}/repos/{repo_full_name}/issues/{issue_number}/comments",
-                headers={
-                    "Authorization": f"Bearer {access_token}",
-                    "Accept": "application/vnd.github.v3+json"
-                },
+                access_token,
                 json={"body": body}
             )
 
@@ -320,20 +620,20 @@ class GitHubClient:
                 }
             else:
                 error_msg = response.json().get("message", response.text)
-                print(f"❌ GitHub API error: {response.status_code} - {error_msg}")
+                logger.error("GitHub API error: %s - %s", response.status_code, error_msg)
                 return {
                     "success": False,
                     "error": f"GitHub API error: {error_msg}"
                 }
 
         except Exception as e:
-            print(f"❌ Error adding comment: {e}")
+            logger.error("Error adding comment: %s", e)
             return {
                 "success": False,
                 "error": str(e)
             }
 
-    def get_repo_labels_with_details(
+    async def get_repo_labels_with_details(
         self,
         access_token: str,
         repo_full_name: str
@@ -342,35 +642,10 @@ class GitHubClient:
         Fetch all labels from a repository with full details.
         Returns list of label dicts with name, color, description.
         """
-        try:
-            response = requests.get(
-                f"{self.api_base}/repos/{repo_full_name}/labels",
-                headers={
-                    "Authorization": f"Bearer {access_token}",
-                    "Accept": "application/vnd.github.v3+json"
-                },
-                params={"per_page": 100}
-            )
-
-            if response.status_code == 200:
-                labels = response.json()
-                return [
-                    {
-                        "name": label["name"],
-                        "color": label["color"],
-                        "description": label.get("description", "")
-                    }
-                    for label in labels
-                ]
-            else:
-                print(f"⚠️  Could not fetch labels: {response.status_code}")
-                return []
+        labels = await self._fetch_labels(access_token, repo_full_name)
+        return [dict(label) for label in labels] if labels else []
 
-        except Exception as e:
-            print(f"⚠️  Error fetching labels: {e}")
-            return []
-
-    def list_pull_requests(
+    async def list_pull_requests(
         self,
         access_token: str,
         repo_full_name: str,
@@ -382,23 +657,10 @@ class GitHubClient:
         Returns list of PR dicts.
         """
         try:
-            response = requests.get(
-                f"{self.api_base}/repos/{repo_full_name}/pulls",
-                headers={
-                    "Authorization": f"Bearer {access_token}",
-                    "Accept": "application/vnd.github.v3+json"
-                },
-                params={
-                    "state": state,
-                    "per_page": per_page,
-                    "sort": "created",
-                    "direction": "desc"
-                }
-            )
-
-            if response.status_code == 200:
-                pulls = response.json()
-                return [
+            status, pulls = await self._conditional_get(
+                access_token,
+                f"{self.api_base}/repos/{repo_full_name.lower()}/pulls",
+                lambda data: [
                     {
                         "number": pr["number"],
                         "title": pr["title"],
@@ -411,17 +673,26 @@ class GitHubClient:
                         "created_at": pr["created_at"],
                         "draft": pr.get("draft", False),
                     }
-                    for pr in pulls
-                ]
-            else:
-                print(f"Error listing PRs: {response.status_code}")
-                return []
+                    for pr in data
+                ],
+                params={
+                    "state": state,
+                    "per_page": per_page,
+                    "sort": "created",
+                    "direction": "desc"
+                }
+            )
+
+            if status == 200:
+                return list(pulls)
+            logger.error("Error listing PRs: %s", status)
+            return []
 
         except Exception as e:
-            print(f"Error listing PRs: {e}")
+            logger.error("Error listing PRs: %s", e)
             return []
 
-    def get_pull_request(
+    async def get_pull_request(
         self,
         access_token: str,
         repo_full_name: str,
@@ -431,12 +702,10 @@ class GitHubClient:
         Get details of a specific pull request.
         """
         try:
-            response = requests.get(
+            response = await self._request(
+                "GET",
                 f"{self.api_base}/repos/{repo_full_name}/pulls/{pr_number}",
-                headers={
-                    "Authorization": f"Bearer {access_token}",
-                    "Accept": "application/vnd.github.v3+json"
-                }
+                access_token
             )
 
             if response.status_code == 200:
@@ -462,14 +731,14 @@ class GitHubClient:
             elif response.status_code == 404:
                 return None
             else:
-                print(f"Error getting PR: {response.status_code}")
+                logger.error("Error getting PR: %s", response.status_code)
                 return None
 
         except Exception as e:
-            print(f"Error getting PR: {e}")
+            logger.error("Error getting PR: %s", e)
             return None
 
-    def merge_pull_request(
+    async def merge_pull_request(
         self,
         access_token: str,
         repo_full_name: str,
@@ -482,12 +751,10 @@ class GitHubClient:
         Returns dict with success status and message.
         """
         try:
-            response = requests.put(
+            response = await self._request(
+                "PUT",
                 f"{self.api_base}/repos/{repo_full_name}/pulls/{pr_number}/merge",
-                headers={
-                    "Authorization": f"Bearer {access_token}",
-                    "Accept": "application/vnd.github.v3+json"
-                },
+                access_token,
                 json={"merge_method": merge_method}
             )
 
@@ -516,42 +783,89 @@ class GitHubClient:
                 }
 
         except Exception as e:
-            print(f"Error merging PR: {e}")
+            logger.error("Error merging PR: %s", e)
             return {
                 "success": False,
                 "error": str(e)
             }
 
-    def get_repo_permissions(self, access_token: str, repo_full_name: str) -> Optional[Dict]:
+    async def create_pull_request(
+        self,
+        access_token: str,
+        repo_full_name: str,
+        head: str,
+        base: str,
+        title: str,
+        body: str
+    ) -> Optional[Dict]:
         """
-        Get repository permissions for the authenticated user.
-        Returns permissions dict (admin/push/pull) if successful.
+        Open a pull request from `head` into `base`.
+        Returns {pr_url, pr_number} if successful.
         """
         try:
-            response = requests.get(
-                f"{self.api_base}/repos/{repo_full_name}",
-                headers={
-                    "Authorization": f"Bearer {access_token}",
-                    "Accept": "application/vnd.github.v3+json"
+            response = await self._request(
+                "POST",
+                f"{self.api_base}/repos/{repo_full_name}/pulls",
+                access_token,
+                json={"title": title, "body": body, "head": head, "base": base}
+            )
+
+            if response.status_code == 201:
+                pr = response.json()
+                return {
+                    "pr_url": pr["html_url"],
+                    "pr_number": pr["number"]
                 }
+            error_msg = response.json().get("message", response.text)
+            logger.error("Error creating PR: %s - %s", response.status_code, error_msg)
+            return None
+
+        except Exception as e:
+            logger.error("Error creating PR: %s", e)
+            return None
+
+    async def get_repo(self, access_token: str, repo_full_name: str) -> Optional[Dict]:
+        """
+        Get a repository's default branch and the user's permissions on it in
+        one request. Returns {default_branch, permissions} if successful, an
+        {_error, _status} dict if GitHub refused, None on a request failure.
+        """
+        try:
+            response = await self._request(
+                "GET",
+                f"{self.api_base}/repos/{repo_full_name}",
+                access_token
             )
 
             if response.status_code == 200:
                 repo = response.json()
-                return repo.get("permissions", {})
+                return {
+                    "default_branch": repo.get("default_branch", "main"),
+                    "permissions": repo.get("permissions", {})
+                }
             else:
                 error_msg = None
                 try:
                     error_msg = response.json().get("message")
                 except Exception:
                     error_msg = response.text
-                print(f"⚠️  Could not fetch repo permissions: {response.status_code} - {error_msg}")
+                logger.warning("Could not fetch repo: %s - %s", response.status_code, error_msg)
                 return {
                     "_error": error_msg or "Unknown error",
                     "_status": response.status_code
                 }
 
         except Exception as e:
-            print(f"⚠️  Error fetching repo permissions: {e}")
+            logger.warning("Error fetching repo: %s", e)
             return None
 
+    async def get_repo_permissions(self, access_token: str, repo_full_name: str) -> Optional[Dict]:
+        """
+        Get repository permissions for the authenticated user.
+        Returns permissions dict (admin/push/pull) if successful.
+        """
+        repo = await self.get_repo(access_token, repo_full_name)
+        if repo is None or repo.get("_error"):
+            return repo
+        return repo["permissions"]
+
@@ -1,121 +1,245 @@
 """
 AI-powered label selection for GitHub issues.
 """
-from typing import List
+import asyncio
+import hashlib
+import json
+import logging
+import re
+from typing import List, Optional
+import httpx
+import orjson
 from openai import AsyncOpenAI
 import os
-from dotenv import load_dotenv
 
-load_dotenv()
-_openai_key = os.getenv("OPENAI_API_KEY")
-client = AsyncOpenAI(api_key=_openai_key) if _openai_key else None
+from ttl_cache import TTLCache
 
+logger = logging.getLogger(__name__)
 
-async def ai_select_labels(title: str, description: str, available_labels: List[str]) -> List[str]:
-    """
-    Let AI select the most appropriate labels from available repo labels.
-    Returns list of selected label names (max 3).
+# Label selection is near-lexical matching; a small model handles it fine
+LIGHT_MODEL = os.getenv("OMI_LIGHT_MODEL", "gpt-4o-mini")
+
+# Upper bound on in-flight OpenAI requests so bursts stay inside the account's rate limits
+_OPENAI_SEM = asyncio.Semaphore(int(os.getenv("OMI_OPENAI_CONCURRENCY", "50")))
+
+# HTTP/2 multiplexes concurrent completions over one connection; needs the `h2` package
+try:
+    import h2  # noqa: F401
+    _HTTP2_AVAILABLE = True
+except ImportError:
+    _HTTP2_AVAILABLE = False
+
+
+def create_openai_client(api_key: str) -> AsyncOpenAI:
     """
-    if not available_labels:
-        return []
-    if client is None:
-        # OpenAI key not configured; skip AI label selection.
-        return []
+    Build the app-wide AsyncOpenAI client with a pooled (HTTP/2 when available) transport.
 
-    try:
-        response = await client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {
-                    "role": "system",
-                    "content": """You are a GitHub issue labeling assistant. Given an issue title, description, and available labels, select the most appropriate labels.
+    Retries are left to the OpenAI client so they back off on 429s; the
+    transport itself never retries.
+    """
+    transport = httpx.AsyncHTTPTransport(
+        http2=_HTTP2_AVAILABLE,
+        retries=0,
+        limits=httpx.Limits(max_connections=200, max_keepalive_connections=100, keepalive_expiry=60.0)
+    )
+    http_client = httpx.AsyncClient(
+        transport=transport,
+        timeout=httpx.Timeout(connect=5.0, read=45.0, write=10.0, pool=5.0)
+    )
+    return AsyncOpenAI(api_key=api_key, http_client=http_client, max_retries=3)
+
+
+# Explicit tags that let keyword_prelabel skip the model: "bug: ...", "feat(ui): ...", "[docs] ..."
+_PREFIX_TAG_RE = re.compile(r'^\s*([A-Za-z][\w -]{0,30}?)(?:\([^)]*\))?!?:\s')
+_BRACKET_TAG_RE = re.compile(r'\[([^\[\]]{1,30})\]')
+# Conventional-commit style prefixes -> common label spellings, tried in order
+_TAG_ALIASES = {
+    "feat": ("feature", "enhancement", "feature-request"),
+    "feature": ("enhancement", "feature-request"),
+    "fix": ("bug",),
+    "bugfix": ("bug",),
+    "doc": ("docs", "documentation"),
+    "docs": ("documentation",),
+    "perf": ("performance",),
+    "test": ("tests", "testing"),
+}
+
+# Identical label requests (same model, prompt and temperature) reuse the last answer
+LLM_CACHE_TTL = 600
+_llm_cache = TTLCache(maxsize=1024, ttl=LLM_CACHE_TTL)
+
+
+# Static system prompt kept byte-identical across calls so OpenAI's prompt
+# caching can reuse it; per-request data (labels, issue text) goes in the user turn.
+_LABEL_SYSTEM_PROMPT = """You are a GitHub issue labeling assistant. Given an issue title, description, and available labels, select the most appropriate labels.
 
 CRITICAL RULES:
 1. ONLY use labels from the provided available list - DO NOT make up new labels
 2. Select 1-3 labels maximum (prefer 1-2)
 3. Match labels EXACTLY as they appear in the available list (case-sensitive, including hyphens/spaces)
-4. Return ONLY the exact label names from the list, comma-separated, nothing else
-5. If no labels fit well, return "none"
+4. Respond with a JSON object of the form {"labels": [...]} containing ONLY exact label names from the list, nothing else
+5. If no labels fit well, respond with {"labels": []}
 
 Examples:
 
-Available: ["bug", "enhancement", "documentation", "help wanted"]
-Issue: "App crashes when clicking submit button"
-Response: bug
-
 Available: ["bug", "feature-request", "iOS", "Android", "backend"]
 Issue: "Add dark mode support for iPhone users"
-Response: feature-request, iOS
+Response: {"labels": ["feature-request", "iOS"]}
 
 Available: ["docs", "api", "frontend"]
 Issue: "Update API documentation for new endpoints"
-Response: docs, api
-
-Available: ["bug", "mobile", "Feature Request"]
-Issue: "App crashes on mobile"
-Response: bug, mobile
+Response: {"labels": ["docs", "api"]}
 
 Remember: Copy the label names EXACTLY as they appear in the available list!"""
-                },
-                {
-                    "role": "user",
-                    "content": f"""Available labels (copy these EXACTLY): {', '.join(available_labels)}
+
+
+def _llm_cache_key(model: str, messages: List[dict], temperature: float) -> str:
+    payload = json.dumps(
+        {"model": model, "messages": messages, "temperature": temperature},
+        sort_keys=True
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _normalize_label(label: str) -> str:
+    return label.lower().replace(' ', '-')
+
+
+def _match_labels(selected_labels: List[str], available_labels: List[str]) -> List[str]:
+    """
+    Map the model's chosen label names onto valid repo label names (max 3).
+    """
+    if isinstance(selected_labels, str):
+        selected_labels = selected_labels.split(',')
+    selected_labels = [label.strip() for label in selected_labels if isinstance(label, str) and label.strip()]
+    if not selected_labels:
+        return []
+    logger.debug("AI returned labels: %s", selected_labels)
+
+    # Validate labels exist in available_labels: exact name first, then one
+    # lookup that ignores case and treats spaces/hyphens as equivalent
+    available_labels_set = set(available_labels)
+    norm_map = {}
+    for avail_label in available_labels:
+        norm_map.setdefault(_normalize_label(avail_label), avail_label)
+    valid_labels = []
+
+    for label in selected_labels:
+        if label in available_labels_set:
+            valid_labels.append(label)
+            logger.debug("  %r matched exactly", label)
+        else:
+            matched_label = norm_map.get(_normalize_label(label))
+            if matched_label is None:
+                logger.debug("  %r not found in available labels - SKIPPING", label)
+                continue
+            valid_labels.append(matched_label)
+            logger.debug("  %r matched as %r (normalized)", label, matched_label)
+
+        if len(valid_labels) >= 3:  # Max 3 labels
+            break
+
+    return valid_labels
+
+
+def keyword_prelabel(title: str, body: str, available_labels: List[str]) -> List[str]:
+    """
+    Pick labels from explicit tags in the issue text, without calling the model.
+
+    Looks at a leading "bug:" / "feat(api):" style prefix and at "[tag]"
+    markers in the title or the first 200 chars of the body. Returns the
+    matching repo labels (max 3), or [] when nothing is tagged explicitly.
+    """
+    if not available_labels:
+        return []
+
+    candidates = []
+    prefix = _PREFIX_TAG_RE.match(title)
+    if prefix:
+        candidates.append(prefix.group(1))
+    candidates.extend(_BRACKET_TAG_RE.findall(title))
+    candidates.extend(_BRACKET_TAG_RE.findall((body or "")[:200]))
+    if not candidates:
+        return []
+
+    norm_map = {}
+    for label in available_labels:
+        norm_map.setdefault(_normalize_label(label), label)
+
+    matched = []
+    for candidate in candidates:
+        key = _normalize_label(candidate.strip())
+        for option in (key, *_TAG_ALIASES.get(key, ())):
+            label = norm_map.get(option)
+            if label:
+                if label not in matched:
+                    matched.append(label)
+                break
+        if len(matched) >= 3:
+            break
+    return matched
+
+
+async def ai_select_labels(
+    title: str,
+    description: str,
+    available_labels: List[str],
+    client: Optional[AsyncOpenAI] = None
+) -> List[str]:
+    """
+    Let AI select the most appropriate labels from available repo labels.
+    Returns list of selected label names (max 3).
+
+    `client` is the app-wide AsyncOpenAI client created in main's lifespan;
+    without one, label selection is skipped.
+    """
+    if not available_labels:
+        return []
+    if client is None:
+        # OpenAI key not configured; skip AI label selection.
+        return []
+
+    model = LIGHT_MODEL
+    temperature = 0.1
+    messages = [
+        {
+            "role": "system",
+            "content": _LABEL_SYSTEM_PROMPT
+        },
+        {
+            "role": "user",
+            "content": f"""Available labels (copy these EXACTLY): {', '.join(available_labels)}
 
 Issue Title: {title}
 Issue Description: {description}
 
 Select the most appropriate labels (use EXACT names from above):"""
-                }
-            ],
-            temperature=0.1,
-            max_tokens=50
-        )
-
-        result = response.choices[0].message.content.strip()
-
-        if result.lower() == "none" or not result:
-            return []
-
-        # Parse comma-separated labels
-        selected_labels = [label.strip() for label in result.split(',')]
-        print(f"AI returned labels: {selected_labels}", flush=True)
-
-        # Validate labels exist in available_labels (exact match and fuzzy match)
-        available_labels_set = set(available_labels)
-        available_labels_lower = {label.lower(): label for label in available_labels}
-        valid_labels = []
-
-        for label in selected_labels:
-            matched = False
-            # First try exact match
-            if label in available_labels_set:
-                valid_labels.append(label)
-                matched = True
-                print(f"  '{label}' matched exactly", flush=True)
-            # Then try case-insensitive match
-            elif label.lower() in available_labels_lower:
-                matched_label = available_labels_lower[label.lower()]
-                valid_labels.append(matched_label)
-                matched = True
-                print(f"  '{label}' matched as '{matched_label}' (case-insensitive)", flush=True)
-            # Try matching with spaces/hyphens normalized
-            else:
-                normalized_label = label.lower().replace(' ', '-')
-                for avail_label in available_labels:
-                    if avail_label.lower().replace(' ', '-') == normalized_label:
-                        valid_labels.append(avail_label)
-                        matched = True
-                        print(f"  '{label}' matched as '{avail_label}' (normalized)", flush=True)
-                        break
-
-            if not matched:
-                print(f"  '{label}' not found in available labels - SKIPPING", flush=True)
-
-            if len(valid_labels) >= 3:  # Max 3 labels
-                break
+        }
+    ]
+
+    cache_key = _llm_cache_key(model, messages, temperature)
+    cached = _llm_cache.get(cache_key)
+    if cached is not None:
+        logger.info("AI labels served from cache: %s", cached)
+        return list(cached)
 
+    try:
+        async with _OPENAI_SEM:
+            response = await client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=50,
+                response_format={"type": "json_object"}
+            )
+
+        data = orjson.loads(response.choices[0].message.content or "{}")
+        requested = data.get("labels") or []
+        valid_labels = _match_labels(requested, available_labels)
+        logger.info("AI label selection: requested=%s matched=%s", requested, valid_labels)
+        _llm_cache.set(cache_key, list(valid_labels))
         return valid_labels
 
     except Exception as e:
-        print(f"AI label selection failed: {e}", flush=True)
+        logger.warning("AI label selection failed: %s", e)
         return []
@@ -4,17 +4,59 @@ OMI GitHub Issues Integration - Chat Tools Based
 This app provides GitHub integration through OAuth2 authentication
 and chat tools for creating and managing GitHub issues.
 """
+import asyncio
+import atexit
+import queue
 import sys
-from fastapi import FastAPI, Request, HTTPException, Query
-from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse
+import logging
+from logging.handlers import QueueHandler, QueueListener
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import Optional
+from fastapi import Depends, FastAPI, Request, HTTPException, Query
+from fastapi.responses import HTMLResponse, ORJSONResponse, RedirectResponse, Response
 import os
 from dotenv import load_dotenv
 import secrets
+import gzip
+import hashlib
+from html import escape
+from urllib.parse import quote
+import orjson
 
-from simple_storage import SimpleUserStorage
+# Load .env once, before any module below reads its settings
+load_dotenv()
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper(), stream=sys.stdout)
+# Hand records to a listener thread so stdout writes never block the event loop
+_log_queue = queue.SimpleQueue()
+_log_listener = QueueListener(_log_queue, *logging.getLogger().handlers, respect_handler_level=True)
+logging.getLogger().handlers = [QueueHandler(_log_queue)]
+_log_listener.start()
+atexit.register(_log_listener.stop)
+# httpx logs every request at INFO; keep only its warnings
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+from simple_storage import SimpleUserStorage, shutdown_storage
 from github_client import GitHubClient
-from issue_detector import ai_select_labels
-from models import ChatToolResponse
+from issue_detector import ai_select_labels, create_openai_client, keyword_prelabel
+from models import AgentKeyIn, ChatToolResponse, RepoSelectionIn, ToolCodeIn
+from ttl_cache import TTLCache
+from pages import (
+    MISSING_CODE_PAGE,
+    MISSING_CODE_PAGE_GZ,
+    MOBILE_CSS_ETAG,
+    MOBILE_CSS_GZ,
+    MOBILE_CSS_GZ_ETAG,
+    OAUTH_SUCCESS_PAGE,
+    SETTINGS,
+    STATE_MISMATCH_PAGE,
+    STATE_MISMATCH_PAGE_GZ,
+    UNAUTH,
+    UNAUTH_VERSION,
+    get_mobile_css,
+    js_literal,
+    render_error,
+)
 from agent_providers import (
     run_agent_provider,
     PROVIDERS,
@@ -23,32 +65,98 @@ from agent_providers import (
     get_provider_base_url,
 )
 
-load_dotenv()
-
 
-def log(msg: str):
-    """Print and flush immediately for Railway logging."""
-    print(msg)
-    sys.stdout.flush()
+logger = logging.getLogger(__name__)
 
 
 # Initialize services
 github_client = GitHubClient()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create shared API clients on the app's event loop and close them on shutdown."""
+    openai_key = os.getenv("OPENAI_API_KEY")
+    app.state.openai_client = create_openai_client(openai_key) if openai_key else None
+    yield
+    await github_client.aclose()
+    if app.state.openai_client is not None:
+        await app.state.openai_client.close()
+    # A save queued with call_soon would be lost once the loop stops
+    shutdown_storage()
+
+
 app = FastAPI(
     title="OMI GitHub Issues Integration",
     description="GitHub issue management via Omi chat tools",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan,
+    # Serialize every JSON response with orjson instead of stdlib json
+    default_response_class=ORJSONResponse
 )
 
-# Store OAuth states temporarily (in production, use Redis or similar)
-oauth_states = {}
+# Provider key -> label map for the settings page script; PROVIDERS is static
+PROVIDER_LABELS_JS = js_literal({key: meta["label"] for key, meta in PROVIDERS.items()})
+
+# Indexed by bool(repo["private"]) when rendering repo lists
+PRIVACY = ("Public", "Private")
+
+# Store OAuth states temporarily (in production, use Redis or similar).
+# Abandoned flows expire after 10 minutes instead of accumulating.
+oauth_states = TTLCache(maxsize=10000, ttl=600)
+
+# gzip'd landing pages by uid (the page only differs in its auth link)
+unauth_gzip_cache = TTLCache(maxsize=1024, ttl=600)
 
 
 # ============================================
 # Helper Functions
 # ============================================
 
+async def read_json(request: Request):
+    """Parse the JSON request body with orjson (much faster than Starlette's stdlib json)."""
+    return orjson.loads(await request.body())
+
+
+def accepts_gzip(request: Request) -> bool:
+    """True if the client's Accept-Encoding allows gzip (ignores an explicit q=0)."""
+    for coding in request.headers.get("accept-encoding", "").lower().split(","):
+        name, _, params = coding.partition(";")
+        if name.strip() in ("gzip", "*"):
+            return params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+
+def html_response(request: Request, body: bytes, gzipped: Optional[bytes] = None,
+                  status_code: int = 200, headers: Optional[dict] = None) -> HTMLResponse:
+    """Serve an HTML body, using its pre-compressed gzip form when the client accepts it."""
+    headers = dict(headers or {}, Vary="Accept-Encoding")
+    if gzipped is not None and accepts_gzip(request):
+        headers["Content-Encoding"] = "gzip"
+        body = gzipped
+    return HTMLResponse(content=body, status_code=status_code, headers=headers)
+
+
+def _labels_suffix(labels: list) -> str:
+    """Format an issue's labels as ' [a, b]' for list output ('' when there are none)."""
+    return " [" + ", ".join(labels) + "]" if labels else ""
+
+
+async def current_user(uid: str = Query(...)) -> dict:
+    """Load the user for a `?uid=` settings request once ({} if unknown)."""
+    return SimpleUserStorage.get_user(uid) or {}
+
+
+def has_github_token(user: Optional[dict]) -> bool:
+    """True if the user connected GitHub and the token hasn't since been rejected."""
+    return bool(user and user.get("access_token")) and not github_client.is_token_revoked(user["access_token"])
+
+
+def stored_repos(repos: list) -> list:
+    """Project repos down to what list_repos and the settings page read before persisting."""
+    return [{"full_name": repo["full_name"], "private": repo.get("private", False)} for repo in repos]
+
+
 def get_repo_for_request(user: dict, repo_param: str = None) -> tuple[str, str]:
     """
     Get repository for a request.
@@ -165,6 +273,10 @@ async def get_omi_tools_manifest():
                         "limit": {
                             "type": "integer",
                             "description": "Maximum number of issues to return (default: 10, max: 50)"
+                        },
+                        "cursor": {
+                            "type": "string",
+                            "description": "Pagination cursor returned by a previous list_issues call. Pass it to get the next page."
                         }
                     },
                     "required": []
@@ -308,9 +420,10 @@ async def tool_create_issue(request: Request):
     Chat tool for Omi - creates an issue in the specified or default repository.
     """
     try:
-        body = await request.json()
-        log(f"=== CREATE_ISSUE START ===")
-        log(f"Request: {body}")
+        body = await read_json(request)
+        logger.info("=== CREATE_ISSUE START ===")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Request: %s", body)
 
         uid = body.get("uid")
         title = body.get("title")
@@ -327,7 +440,7 @@ async def tool_create_issue(request: Request):
 
         # Get user and validate auth
         user = SimpleUserStorage.get_user(uid)
-        if not user or not user.get("access_token"):
+        if not has_github_token(user):
             return ChatToolResponse(
                 error="Please connect your GitHub account first in the app settings."
             )
@@ -339,19 +452,32 @@ async def tool_create_issue(request: Request):
 
         access_token = user["access_token"]
 
-        # Auto-select labels if enabled and no labels provided
+        # Auto-select labels if enabled and no labels provided.
+        # Start the label fetch right away so it overlaps with the work below.
+        labels_task = None
         if auto_labels and not labels:
-            repo_labels = github_client.get_repo_labels(access_token, repo_full_name)
-            if repo_labels:
-                log(f"Found {len(repo_labels)} labels, running AI selection...")
-                labels = await ai_select_labels(title, issue_body or "", repo_labels)
-                if labels:
-                    log(f"AI selected labels: {labels}")
+            labels_task = asyncio.create_task(github_client.get_repo_labels(access_token, repo_full_name))
 
         # Add footer to issue body
         footer = "\n\n---\n*Created via Omi*"
         full_body = (issue_body + footer) if issue_body else footer.strip()
 
+        if labels_task is not None:
+            repo_labels = await labels_task
+            if repo_labels:
+                # Explicitly tagged issues ("bug: ...", "[docs] ...") don't need the model
+                labels = keyword_prelabel(title, issue_body or "", repo_labels)
+                if labels:
+                    logger.info("Keyword-matched labels: %s", labels)
+                else:
+                    logger.info("Found %d labels, running AI selection...", len(repo_labels))
+                    labels = await ai_select_labels(
+                        title, issue_body or "", repo_labels,
+                        client=request.app.state.openai_client
+                    )
+                    if labels:
+                        logger.info("AI selected labels: %s", labels)
+
         # Create the issue
         result = await github_client.create_issue(
             access_token=access_token,
@@ -375,17 +501,15 @@ async def tool_create_issue(request: Request):
                 result_parts.append(f"Labels: {', '.join(labels)}")
             result_parts.append(f"URL: {issue_url}")
 
-            log(f"SUCCESS: Issue #{issue_number} created")
+            logger.info("SUCCESS: Issue #%s created", issue_number)
             return ChatToolResponse(result="\n".join(result_parts))
         else:
             error = result.get("error", "Unknown error") if result else "Failed"
-            log(f"ERROR: {error}")
+            logger.error("ERROR: %s", error)
             return ChatToolResponse(error=f"Failed to create issue: {error}")
 
     except Exception as e:
-        import traceback
-        log(f"EXCEPTION: {e}")
-        log(traceback.format_exc())
+        logger.exception("EXCEPTION: %s", e)
         return ChatToolResponse(error=f"Failed to create issue: {str(e)}")
 
 
@@ -395,14 +519,14 @@ async def tool_list_repos(request: Request):
     List user's GitHub repositories.
     """
     try:
-        body = await request.json()
+        body = await read_json(request)
         uid = body.get("uid")
 
         if not uid:
             return ChatToolResponse(error="User ID is required")
 
         user = SimpleUserStorage.get_user(uid)
-        if not user or not user.get("access_token"):
+        if not has_github_token(user):
             return ChatToolResponse(
                 error="Please connect your GitHub account first in the app settings."
             )
@@ -410,26 +534,28 @@ async def tool_list_repos(request: Request):
         repos = user.get("available_repos", [])
         if not repos:
             # Fetch fresh if not cached
-            repos = github_client.list_user_repos(user["access_token"])
+            repos = await github_client.list_user_repos(user["access_token"])
 
         if not repos:
             return ChatToolResponse(result="You don't have any repositories on GitHub.")
 
-        default_repo = user.get("selected_repo", "")
+        default_repos = {user.get("selected_repo", "")}
 
-        result_parts = [f"**Your GitHub Repositories ({len(repos)})**", ""]
-        for i, repo in enumerate(repos[:20], 1):  # Limit to 20
-            privacy = "Private" if repo.get("private") else "Public"
-            default_marker = " (default)" if repo["full_name"] == default_repo else ""
-            result_parts.append(f"{i}. **{repo['full_name']}**{default_marker} - {privacy}")
+        repo_lines = "\n".join(
+            f"{i}. **{repo['full_name']}**"
+            f"{' (default)' if repo['full_name'] in default_repos else ''}"
+            f" - {PRIVACY[bool(repo.get('private'))]}"
+            for i, repo in enumerate(repos[:20], 1)  # Limit to 20
+        )
+        result = f"**Your GitHub Repositories ({len(repos)})**\n\n{repo_lines}"
 
         if len(repos) > 20:
-            result_parts.append(f"\n... and {len(repos) - 20} more repositories")
+            result += f"\n\n... and {len(repos) - 20} more repositories"
 
-        return ChatToolResponse(result="\n".join(result_parts))
+        return ChatToolResponse(result=result)
 
     except Exception as e:
-        log(f"Error listing repos: {e}")
+        logger.error("Error listing repos: %s", e)
         return ChatToolResponse(error=f"Failed to list repositories: {str(e)}")
 
 
@@ -439,17 +565,18 @@ async def tool_list_issues(request: Request):
     List issues in a GitHub repository.
     """
     try:
-        body = await request.json()
+        body = await read_json(request)
         uid = body.get("uid")
         repo = body.get("repo")
         state = body.get("state", "open")
         limit = min(body.get("limit", 10), 50)
+        cursor = body.get("cursor")
 
         if not uid:
             return ChatToolResponse(error="User ID is required")
 
         user = SimpleUserStorage.get_user(uid)
-        if not user or not user.get("access_token"):
+        if not has_github_token(user):
             return ChatToolResponse(
                 error="Please connect your GitHub account first in the app settings."
             )
@@ -458,25 +585,31 @@ async def tool_list_issues(request: Request):
         if error:
             return ChatToolResponse(error=error)
 
-        issues = github_client.list_issues(
+        page = await github_client.list_issues_page(
             access_token=user["access_token"],
             repo_full_name=repo_full_name,
             state=state,
-            per_page=limit
+            per_page=limit,
+            cursor=cursor
         )
+        issues = page["issues"]
 
         if not issues:
             return ChatToolResponse(result=f"No {state} issues found in {repo_full_name}.")
 
-        result_parts = [f"**{state.title()} Issues in {repo_full_name} ({len(issues)})**", ""]
-        for issue in issues:
-            labels_str = f" [{', '.join(issue['labels'])}]" if issue.get('labels') else ""
-            result_parts.append(f"• **#{issue['number']}** - {issue['title']}{labels_str}")
+        issue_lines = "\n".join(
+            f'• **#{issue["number"]}** - {issue["title"]}{_labels_suffix(issue.get("labels"))}'
+            for issue in issues
+        )
+        result = f"**{state.title()} Issues in {repo_full_name} ({len(issues)})**\n\n{issue_lines}"
 
-        return ChatToolResponse(result="\n".join(result_parts))
+        if page["has_next_page"]:
+            result += f"\n\nMore issues available (cursor: `{page['end_cursor']}`)"
+
+        return ChatToolResponse(result=result)
 
     except Exception as e:
-        log(f"Error listing issues: {e}")
+        logger.error("Error listing issues: %s", e)
         return ChatToolResponse(error=f"Failed to list issues: {str(e)}")
 
 
@@ -486,7 +619,7 @@ async def tool_get_issue(request: Request):
     Get details of a specific GitHub issue.
     """
     try:
-        body = await request.json()
+        body = await read_json(request)
         uid = body.get("uid")
         issue_number = body.get("issue_number")
         repo = body.get("repo")
@@ -498,7 +631,7 @@ async def tool_get_issue(request: Request):
             return ChatToolResponse(error="Issue number is required")
 
         user = SimpleUserStorage.get_user(uid)
-        if not user or not user.get("access_token"):
+        if not has_github_token(user):
             return ChatToolResponse(
                 error="Please connect your GitHub account first in the app settings."
             )
@@ -507,10 +640,11 @@ async def tool_get_issue(request: Request):
         if error:
             return ChatToolResponse(error=error)
 
-        issue = github_client.get_issue(
+        issue = await github_client.get_issue(
             access_token=user["access_token"],
             repo_full_name=repo_full_name,
-            issue_number=int(issue_number)
+            issue_number=int(issue_number),
+            body_max_chars=500
         )
 
         if not issue:
@@ -524,11 +658,8 @@ async def tool_get_issue(request: Request):
         ]
 
         if issue.get('body'):
-            # Truncate long bodies
-            body_preview = issue['body'][:500]
-            if len(issue['body']) > 500:
-                body_preview += "..."
-            result_parts.append(body_preview)
+            # Long bodies arrive already cut to 500 chars
+            result_parts.append(issue['body'] + ("..." if issue['body_truncated'] else ""))
             result_parts.append("")
 
         if issue.get('labels'):
@@ -542,7 +673,7 @@ async def tool_get_issue(request: Request):
         return ChatToolResponse(result="\n".join(result_parts))
 
     except Exception as e:
-        log(f"Error getting issue: {e}")
+        logger.error("Error getting issue: %s", e)
         return ChatToolResponse(error=f"Failed to get issue: {str(e)}")
 
 
@@ -552,7 +683,7 @@ async def tool_list_labels(request: Request):
     List available labels in a repository.
     """
     try:
-        body = await request.json()
+        body = await read_json(request)
         uid = body.get("uid")
         repo = body.get("repo")
 
@@ -560,7 +691,7 @@ async def tool_list_labels(request: Request):
             return ChatToolResponse(error="User ID is required")
 
         user = SimpleUserStorage.get_user(uid)
-        if not user or not user.get("access_token"):
+        if not has_github_token(user):
             return ChatToolResponse(
                 error="Please connect your GitHub account first in the app settings."
             )
@@ -569,7 +700,7 @@ async def tool_list_labels(request: Request):
         if error:
             return ChatToolResponse(error=error)
 
-        labels = github_client.get_repo_labels_with_details(
+        labels = await github_client.get_repo_labels_with_details(
             access_token=user["access_token"],
             repo_full_name=repo_full_name
         )
@@ -577,15 +708,15 @@ async def tool_list_labels(request: Request):
         if not labels:
             return ChatToolResponse(result=f"No labels found in {repo_full_name}.")
 
-        result_parts = [f"**Labels in {repo_full_name} ({len(labels)})**", ""]
-        for label in labels:
-            desc = f" - {label['description']}" if label.get('description') else ""
-            result_parts.append(f"• **{label['name']}**{desc}")
+        label_lines = "\n".join(
+            f"• **{label['name']}**{' - ' + label['description'] if label.get('description') else ''}"
+            for label in labels
+        )
 
-        return ChatToolResponse(result="\n".join(result_parts))
+        return ChatToolResponse(result=f"**Labels in {repo_full_name} ({len(labels)})**\n\n{label_lines}")
 
     except Exception as e:
-        log(f"Error listing labels: {e}")
+        logger.error("Error listing labels: %s", e)
         return ChatToolResponse(error=f"Failed to list labels: {str(e)}")
 
 
@@ -595,7 +726,7 @@ async def tool_add_comment(request: Request):
     Add a comment to a GitHub issue.
     """
     try:
-        body = await request.json()
+        body = await read_json(request)
         uid = body.get("uid")
         issue_number = body.get("issue_number")
         comment_body = body.get("body")
@@ -611,7 +742,7 @@ async def tool_add_comment(request: Request):
             return ChatToolResponse(error="Comment body is required")
 
         user = SimpleUserStorage.get_user(uid)
-        if not user or not user.get("access_token"):
+        if not has_github_token(user):
             return ChatToolResponse(
                 error="Please connect your GitHub account first in the app settings."
             )
@@ -620,7 +751,7 @@ async def tool_add_comment(request: Request):
         if error:
             return ChatToolResponse(error=error)
 
-        result = github_client.add_issue_comment(
+        result = await github_client.add_issue_comment(
             access_token=user["access_token"],
             repo_full_name=repo_full_name,
             issue_number=int(issue_number),
@@ -636,7 +767,7 @@ async def tool_add_comment(request: Request):
             return ChatToolResponse(error=f"Failed to add comment: {error}")
 
     except Exception as e:
-        log(f"Error adding comment: {e}")
+        logger.error("Error adding comment: %s", e)
         return ChatToolResponse(error=f"Failed to add comment: {str(e)}")
 
 
@@ -646,7 +777,7 @@ async def tool_list_prs(request: Request):
     List pull requests in a GitHub repository.
     """
     try:
-        body = await request.json()
+        body = await read_json(request)
         uid = body.get("uid")
         repo = body.get("repo")
         state = body.get("state", "open")
@@ -656,7 +787,7 @@ async def tool_list_prs(request: Request):
             return ChatToolResponse(error="User ID is required")
 
         user = SimpleUserStorage.get_user(uid)
-        if not user or not user.get("access_token"):
+        if not has_github_token(user):
             return ChatToolResponse(
                 error="Please connect your GitHub account first in the app settings."
             )
@@ -665,7 +796,7 @@ async def tool_list_prs(request: Request):
         if error:
             return ChatToolResponse(error=error)
 
-        prs = github_client.list_pull_requests(
+        prs = await github_client.list_pull_requests(
             access_token=user["access_token"],
             repo_full_name=repo_full_name,
             state=state,
@@ -685,7 +816,7 @@ async def tool_list_prs(request: Request):
         return ChatToolResponse(result="\n".join(result_parts))
 
     except Exception as e:
-        log(f"Error listing PRs: {e}")
+        logger.error("Error listing PRs: %s", e)
         return ChatToolResponse(error=f"Failed to list pull requests: {str(e)}")
 
 
@@ -695,7 +826,7 @@ async def tool_merge_pr(request: Request):
     Merge a pull request in a GitHub repository.
     """
     try:
-        body = await request.json()
+        body = await read_json(request)
         uid = body.get("uid")
         pr_number = body.get("pr_number")
         repo = body.get("repo")
@@ -711,7 +842,7 @@ async def tool_merge_pr(request: Request):
             return ChatToolResponse(error="merge_method must be 'squash', 'merge', or 'rebase'")
 
         user = SimpleUserStorage.get_user(uid)
-        if not user or not user.get("access_token"):
+        if not has_github_token(user):
             return ChatToolResponse(
                 error="Please connect your GitHub account first in the app settings."
             )
@@ -722,15 +853,17 @@ async def tool_merge_pr(request: Request):
 
         access_token = user["access_token"]
 
-        # Check permissions
-        permissions = github_client.get_repo_permissions(access_token, repo_full_name)
+        # Permission check and PR lookup are independent; fetch both at once
+        permissions, pr = await asyncio.gather(
+            github_client.get_repo_permissions(access_token, repo_full_name),
+            github_client.get_pull_request(access_token, repo_full_name, int(pr_number))
+        )
         if not permissions or not (permissions.get("push") or permissions.get("admin")):
             return ChatToolResponse(
                 error="You don't have write access to this repository. Cannot merge PRs."
             )
 
-        # Get PR details first to validate it exists and is open
-        pr = github_client.get_pull_request(access_token, repo_full_name, int(pr_number))
+        # Validate the PR exists and is open
         if not pr:
             return ChatToolResponse(error=f"Pull request #{pr_number} not found in {repo_full_name}")
 
@@ -750,8 +883,8 @@ async def tool_merge_pr(request: Request):
             )
 
         # Merge the PR
-        log(f"Merging PR #{pr_number} in {repo_full_name} using {merge_method}...")
-        result = github_client.merge_pull_request(
+        logger.info("Merging PR #%s in %s using %s...", pr_number, repo_full_name, merge_method)
+        result = await github_client.merge_pull_request(
             access_token=access_token,
             repo_full_name=repo_full_name,
             pr_number=int(pr_number),
@@ -771,7 +904,7 @@ async def tool_merge_pr(request: Request):
             )
 
     except Exception as e:
-        log(f"Error merging PR: {e}")
+        logger.error("Error merging PR: %s", e)
         return ChatToolResponse(error=f"Failed to merge pull request: {str(e)}")
 
 
@@ -780,7 +913,7 @@ async def tool_merge_pr(request: Request):
 # ============================================
 
 @app.get("/")
-async def root(uid: str = Query(None)):
+async def root(request: Request, uid: str = Query(None)):
     """Root endpoint - Homepage with repo selection (mobile-first UI)."""
     if not uid:
         return {
@@ -797,76 +930,29 @@ async def root(uid: str = Query(None)):
     # Get user info
     user = SimpleUserStorage.get_user(uid)
 
-    if not user or not user.get("access_token"):
+    if not has_github_token(user):
         # Not authenticated - show auth page
-        auth_url = f"/auth?uid={uid}"
-        return HTMLResponse(content=f"""
-        <html>
-            <head>
-                <meta name="viewport" content="width=device-width, initial-scale=1">
-                <style>
-                    {get_mobile_css()}
-                </style>
-            </head>
-            <body>
-                <div class="container">
-                    <div class="icon">🐙</div>
-                    <h1>GitHub Issues</h1>
-                    <p style="font-size: 18px;">Create and manage GitHub issues through Omi chat</p>
-
-                    <a href="{auth_url}" class="btn btn-primary btn-block" style="font-size: 17px; padding: 16px;">
-                        Connect GitHub Account
-                    </a>
-
-                    <div class="card">
-                        <h3>How It Works</h3>
-                        <div class="steps">
-                            <div class="step">
-                                <div class="step-number">1</div>
-                                <div class="step-content">
-                                    <strong>Connect</strong> your GitHub account securely
-                                </div>
-                            </div>
-                            <div class="step">
-                                <div class="step-number">2</div>
-                                <div class="step-content">
-                                    <strong>Select</strong> your default repository
-                                </div>
-                            </div>
-                            <div class="step">
-                                <div class="step-number">3</div>
-                                <div class="step-content">
-                                    <strong>Chat</strong> with Omi to create and manage issues
-                                </div>
-                            </div>
-                        </div>
-                    </div>
-
-                    <div class="card">
-                        <h3>What You Can Do</h3>
-                        <ul style="list-style: none; padding: 0;">
-                            <li style="padding: 10px 0; border-bottom: 1px solid #21262d;">
-                                <strong>Create Issues</strong> - Report bugs, request features
-                            </li>
-                            <li style="padding: 10px 0; border-bottom: 1px solid #21262d;">
-                                <strong>List Issues</strong> - View open/closed issues
-                            </li>
-                            <li style="padding: 10px 0; border-bottom: 1px solid #21262d;">
-                                <strong>Add Comments</strong> - Respond to issues
-                            </li>
-                            <li style="padding: 10px 0;">
-                                <strong>Auto-Labels</strong> - AI selects appropriate tags
-                            </li>
-                        </ul>
-                    </div>
-
-                    <div class="footer">
-                        <p>Powered by <strong>Omi</strong></p>
-                    </div>
-                </div>
-            </body>
-        </html>
-        """)
+        # Same markup for everyone apart from the uid in the link, so the ETag
+        # is cheap to derive. no-cache (not max-age): once the user connects,
+        # this URL must switch to the settings page on the next visit.
+        # Strong validators differ per representation, so gzip gets its own tag
+        use_gzip = accepts_gzip(request)
+        uid_hash = hashlib.blake2b(uid.encode(), digest_size=8).hexdigest()
+        etag = f'"{UNAUTH_VERSION}-{uid_hash}-gzip"' if use_gzip else f'"{UNAUTH_VERSION}-{uid_hash}"'
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers=dict(headers, Vary="Accept-Encoding"))
+
+        auth_url = f"/auth?uid={quote(uid, safe='')}"
+        body = UNAUTH.render(auth_url=auth_url)
+        gzipped = None
+        if use_gzip:
+            # Compress once per uid; repeat visits reuse the cached body
+            gzipped = unauth_gzip_cache.get(uid)
+            if gzipped is None:
+                gzipped = gzip.compress(body, 9)
+                unauth_gzip_cache[uid] = gzipped
+        return html_response(request, body, gzipped, headers=headers)
 
     # Authenticated - show repo selection page
     repos = user.get("available_repos", [])
@@ -876,365 +962,77 @@ async def root(uid: str = Query(None)):
     if agent_provider not in PROVIDERS:
         agent_provider = "cursor"
 
-    provider_options = ""
-    for provider_key, meta in PROVIDERS.items():
-        selected_attr = 'selected' if provider_key == agent_provider else ''
-        provider_options += f'<option value="{provider_key}" {selected_attr}>{meta["label"]}</option>'
-
     agent_api_keys = user.get("agent_api_keys", {})
-    current_agent_key = agent_api_keys.get(agent_provider, "")
-    masked_agent_key = (current_agent_key[:10] + "...") if current_agent_key else ""
-    masked_keys_by_provider = {
-        key: (value[:10] + "...") if value else ""
+    masked_keys = tuple(
+        (key, (value[:10] + "...") if value else "")
         for key, value in agent_api_keys.items()
+    )
+    repos_key = tuple((repo["full_name"], bool(repo.get("private"))) for repo in repos)
+
+    return HTMLResponse(content=render_settings(
+        uid, github_username, repos_key, selected_repo, agent_provider, masked_keys
+    ))
+
+
+@lru_cache(maxsize=256)
+def render_settings(
+    uid: str,
+    github_username: str,
+    repos_key: tuple,
+    selected_repo: str,
+    agent_provider: str,
+    masked_keys: tuple
+) -> bytes:
+    """
+    Render the settings page body.
+
+    Every input is part of the cache key, so a repeat visit with unchanged
+    settings reuses the bytes, and any change simply misses (no explicit
+    invalidation needed). Only masked key prefixes are passed in.
+    """
+    provider_options = "".join(
+        f'<option value="{provider_key}" {"selected" if provider_key == agent_provider else ""}>{escape(meta["label"])}</option>'
+        for provider_key, meta in PROVIDERS.items()
+    )
+
+    masked_keys_by_provider = dict(masked_keys)
+    masked_agent_key = masked_keys_by_provider.get(agent_provider, "")
+
+    # Repo names and usernames come from GitHub/storage: escape before embedding
+    repo_options = "".join(
+        f'<option value="{name}" {"selected" if full_name == selected_repo else ""}>'
+        f'{name} ({PRIVACY[private]})</option>'
+        for full_name, private in repos_key
+        for name in (escape(full_name),)
+    )
+
+    return SETTINGS.render(
+        uid_js=js_literal(uid),
+        github_username=escape(github_username),
+        repo_options=repo_options or '<option>No repositories found</option>',
+        provider_options=provider_options,
+        masked_agent_key=escape(masked_agent_key),
+        provider_labels_js=PROVIDER_LABELS_JS,
+        provider_keys_js=js_literal(masked_keys_by_provider)
+    )
+
+
+@app.get("/static/mobile.css")
+async def mobile_css(request: Request):
+    """The shared page stylesheet, pre-compressed and revalidated by ETag."""
+    gzipped = accepts_gzip(request)
+    etag = MOBILE_CSS_GZ_ETAG if gzipped else MOBILE_CSS_ETAG
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "public, max-age=3600, must-revalidate",
+        "Vary": "Accept-Encoding"
     }
-    provider_labels_js = "{" + ",".join(
-        [f'"{key}":"{meta["label"]}"' for key, meta in PROVIDERS.items()]
-    ) + "}"
-    provider_keys_js = "{" + ",".join(
-        [f'"{key}":"{value}"' for key, value in masked_keys_by_provider.items()]
-    ) + "}"
-
-    repo_options = ""
-    for repo in repos:
-        selected_attr = 'selected' if repo['full_name'] == selected_repo else ''
-        privacy = "Private" if repo.get('private') else "Public"
-        repo_options += f'<option value="{repo["full_name"]}" {selected_attr}>{repo["full_name"]} ({privacy})</option>'
-
-    return HTMLResponse(content=f"""
-    <html>
-        <head>
-            <meta name="viewport" content="width=device-width, initial-scale=1">
-            <title>GitHub Issues - Settings</title>
-            <style>
-                {get_mobile_css()}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="card" style="margin-top: 20px;">
-                    <h2>Default Repository</h2>
-                    <p style="text-align: left; font-size: 14px; margin-bottom: 8px; color: #8b949e;">
-                        Logged in as <span class="username">@{github_username}</span>
-                    </p>
-                    <p style="text-align: left; font-size: 14px; margin-bottom: 16px;">
-                        Issues will be created here by default:
-                    </p>
-
-                    <select id="repoSelect" class="repo-select">
-                        {repo_options if repo_options else '<option>No repositories found</option>'}
-                    </select>
-
-                    <button class="btn btn-primary btn-block" onclick="updateRepo()">
-                        Save Repository
-                    </button>
-                    <button class="btn btn-secondary btn-block" onclick="refreshRepos()">
-                        Refresh Repositories
-                    </button>
-                    <button class="btn btn-secondary btn-block" onclick="checkRepoAccess()">
-                        Check Repo Access
-                    </button>
-                </div>
-
-                <div class="card">
-                    <h3>Agent Settings</h3>
-                    <p style="text-align: left; font-size: 14px; margin-bottom: 16px;">
-                        Choose which coding agent to use and add its API key (optional).
-                    </p>
-
-                    <label style="display: block; text-align: left; font-size: 12px; color: #8b949e; margin-bottom: 6px;">
-                        Agent Provider
-                    </label>
-                    <select id="agentProviderSelect" class="repo-select" onchange="updateAgentPlaceholder()">
-                        {provider_options}
-                    </select>
-
-                    <input type="password"
-                           id="agentKey"
-                           placeholder="API key for selected provider"
-                           style="width: 100%; padding: 12px; background: #0d1117; border: 1px solid #30363d; border-radius: 6px; color: #c9d1d9; font-size: 14px; margin-bottom: 12px;"
-                           value="{masked_agent_key}">
-
-                    <div style="display: flex; gap: 8px;">
-                        <button class="btn btn-secondary" onclick="saveAgentProvider()">
-                            Save Provider
-                        </button>
-                        <button class="btn btn-primary" onclick="saveAgentKey()" style="flex: 1;">
-                            Save API Key
-                        </button>
-                        <button class="btn btn-secondary" onclick="deleteAgentKey()">
-                            Remove
-                        </button>
-                    </div>
-
-                    <div style="margin-top: 16px;">
-                        <label style="display: block; text-align: left; font-size: 12px; color: #8b949e; margin-bottom: 6px;">
-                            Test Agent Command
-                        </label>
-                        <input type="text"
-                               id="agentTestPrompt"
-                               placeholder="e.g. Summarize repo structure"
-                               style="width: 100%; padding: 12px; background: #0d1117; border: 1px solid #30363d; border-radius: 6px; color: #c9d1d9; font-size: 14px; margin-bottom: 12px;">
-                        <label style="display: flex; align-items: center; gap: 8px; text-align: left; font-size: 12px; color: #8b949e; margin-bottom: 10px;">
-                            <input type="checkbox" id="agentTestAll" style="accent-color: #238636;">
-                            Send to all agents
-                        </label>
-                        <button class="btn btn-primary btn-block" onclick="sendAgentTest()">
-                            Send Test Command
-                        </button>
-                        <textarea id="agentTestLogs"
-                                  readonly
-                                  placeholder="Logs will appear here..."
-                                  style="width: 100%; height: 140px; margin-top: 12px; padding: 12px; background: #0d1117; border: 1px solid #30363d; border-radius: 6px; color: #c9d1d9; font-size: 12px; resize: vertical;"></textarea>
-                    </div>
-
-                    <p style="text-align: left; font-size: 12px; color: #8b949e; margin-top: 12px;">
-                        Agent uses your GitHub OAuth token for repo access. Ensure you have write access.
-                    </p>
-                </div>
-
-                <div class="card">
-                    <h3>Using Chat Commands</h3>
-                    <p style="text-align: left; margin-bottom: 16px;">
-                        Just chat with Omi naturally:
-                    </p>
-                    <div class="example">
-                        "Create an issue for the login bug"
-                    </div>
-                    <div class="example">
-                        "Show me recent issues"
-                    </div>
-                    <div class="example">
-                        "Add a comment to issue #42"
-                    </div>
-                </div>
-
-                <div class="card">
-                    <h3>Tips</h3>
-                    <ul style="list-style: none; padding: 0;">
-                        <li style="padding: 8px 0;">
-                            <strong>Be specific</strong> - Include details in issue descriptions
-                        </li>
-                        <li style="padding: 8px 0;">
-                            <strong>Auto-labels</strong> - AI picks relevant labels automatically
-                        </li>
-                        <li style="padding: 8px 0;">
-                            <strong>Different repos</strong> - Specify repo name to override default
-                        </li>
-                    </ul>
-                </div>
-
-                <div class="footer">
-                    <p>Powered by <strong>Omi</strong></p>
-                </div>
-            </div>
-
-            <script>
-                async function updateRepo() {{
-                    const select = document.getElementById('repoSelect');
-                    const repo = select.value;
-
-                    if (!repo || repo === 'No repositories found') {{
-                        alert('Please select a valid repository');
-                        return;
-                    }}
-
-                    try {{
-                        const response = await fetch('/update-repo?uid={uid}&repo=' + encodeURIComponent(repo), {{
-                            method: 'POST'
-                        }});
-
-                        const data = await response.json();
-
-                        if (data.success) {{
-                            alert('Repository updated successfully!');
-                        }} else {{
-                            alert('Failed to update: ' + data.error);
-                        }}
-                    }} catch (error) {{
-                        alert('Error: ' + error.message);
-                    }}
-                }}
-
-                async function refreshRepos() {{
-                    if (!confirm('Refresh your repository list from GitHub?')) return;
-
-                    try {{
-                        const response = await fetch('/refresh-repos?uid={uid}', {{
-                            method: 'POST'
-                        }});
-
-                        const data = await response.json();
-
-                        if (data.success) {{
-                            alert('Repositories refreshed! Reloading page...');
-                            window.location.reload();
-                        }} else {{
-                            alert('Failed to refresh: ' + data.error);
-                        }}
-                    }} catch (error) {{
-                        alert('Error: ' + error.message);
-                    }}
-                }}
-
-                async function checkRepoAccess() {{
-                    const select = document.getElementById('repoSelect');
-                    const repo = select.value;
-
-                    if (!repo || repo === 'No repositories found') {{
-                        alert('Please select a valid repository');
-                        return;
-                    }}
-
-                    try {{
-                        const response = await fetch('/check-repo-access?uid={uid}&repo=' + encodeURIComponent(repo), {{
-                            method: 'POST'
-                        }});
-                        const data = await response.json();
-
-                        if (data.success) {{
-                            alert('Repo access: ' + data.message);
-                        }} else {{
-                            alert('Access check failed: ' + data.error);
-                        }}
-                    }} catch (error) {{
-                        alert('Error: ' + error.message);
-                    }}
-                }}
-
-                const agentProviderLabels = {provider_labels_js};
-                const agentProviderKeys = {provider_keys_js};
-
-                function getSelectedProvider() {{
-                    const select = document.getElementById('agentProviderSelect');
-                    return select.value;
-                }}
-
-                function updateAgentPlaceholder() {{
-                    const provider = getSelectedProvider();
-                    const label = agentProviderLabels[provider] || 'Agent';
-                    const input = document.getElementById('agentKey');
-                    input.placeholder = label + ' API key';
-                    input.value = agentProviderKeys[provider] || '';
-                }}
-
-                async function saveAgentProvider() {{
-                    const provider = getSelectedProvider();
-                    try {{
-                        const response = await fetch('/save-agent-provider?uid={uid}&provider=' + encodeURIComponent(provider), {{
-                            method: 'POST'
-                        }});
-                        const data = await response.json();
-
-                        if (data.success) {{
-                            alert('Agent provider saved!');
-                        }} else {{
-                            alert('Failed to save: ' + data.error);
-                        }}
-                    }} catch (error) {{
-                        alert('Error: ' + error.message);
-                    }}
-                }}
-
-                async function saveAgentKey() {{
-                    const provider = getSelectedProvider();
-                    const keyInput = document.getElementById('agentKey');
-                    const apiKey = keyInput.value.trim();
-
-                    if (!apiKey) {{
-                        alert('Please enter an API key');
-                        return;
-                    }}
-
-                    try {{
-                        await fetch('/save-agent-key?uid={uid}&provider=' + encodeURIComponent(provider) + '&key=' + encodeURIComponent(apiKey), {{
-                            method: 'POST'
-                        }});
-
-                        alert('API key saved successfully!');
-                    }} catch (error) {{
-                        alert('Error: ' + error.message);
-                    }}
-                }}
-
-                async function deleteAgentKey() {{
-                    const provider = getSelectedProvider();
-                    if (!confirm('Remove the API key for this provider?')) return;
-
-                    try {{
-                        await fetch('/delete-agent-key?uid={uid}&provider=' + encodeURIComponent(provider), {{
-                            method: 'POST'
-                        }});
-
-                        document.getElementById('agentKey').value = '';
-                        alert('API key removed successfully!');
-                    }} catch (error) {{
-                        alert('Error: ' + error.message);
-                    }}
-                }}
-
-
-                async function sendAgentTest() {{
-                    const promptInput = document.getElementById('agentTestPrompt');
-                    const prompt = promptInput.value.trim();
-                    const provider = getSelectedProvider();
-                    const repo = document.getElementById('repoSelect').value;
-                    const sendAll = document.getElementById('agentTestAll').checked;
-                    const logsEl = document.getElementById('agentTestLogs');
-
-                    if (!prompt) {{
-                        alert('Please enter a test command');
-                        return;
-                    }}
-
-                    try {{
-                        const response = await fetch('/test-agent', {{
-                            method: 'POST',
-                            headers: {{
-                                'Content-Type': 'application/json'
-                            }},
-                            body: JSON.stringify({{
-                                uid: '{uid}',
-                                prompt,
-                                provider,
-                                repo,
-                                all: sendAll
-                            }})
-                        }});
-                        const data = await response.json();
-
-                        if (data.success) {{
-                            const logs = data.logs || [];
-                            const lines = [];
-                            for (const entry of logs) {{
-                                const status = entry.success ? 'OK' : 'ERR';
-                                const msg = entry.message || '';
-                                const url = entry.pr_url ? ' PR: ' + entry.pr_url : '';
-                                const agentUrl = entry.agent_url ? ' Agent: ' + entry.agent_url : '';
-                                lines.push('[' + entry.provider + '] ' + status + ' ' + msg + url + agentUrl);
-                            }}
-                            logsEl.value = lines.join('\\n');
-                            if (!logs.length && data.message) {{
-                                logsEl.value = data.message;
-                            }}
-                            if (!sendAll) {{
-                                const info = data.message || 'Command sent successfully';
-                                const prUrl = data.pr_url ? '\\nPR: ' + data.pr_url : '';
-                                alert(info + prUrl);
-                            }}
-                        }} else {{
-                            logsEl.value = 'Agent test failed: ' + data.error;
-                            alert('Agent test failed: ' + data.error);
-                        }}
-                    }} catch (error) {{
-                        logsEl.value = 'Error: ' + error.message;
-                        alert('Error: ' + error.message);
-                    }}
-                }}
-            </script>
-        </body>
-    </html>
-    """)
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    if gzipped:
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=MOBILE_CSS_GZ, media_type="text/css", headers=headers)
+    return Response(content=get_mobile_css(), media_type="text/css", headers=headers)
 
 
 @app.get("/auth")
@@ -1252,8 +1050,7 @@ async def auth_start(uid: str = Query(..., description="User ID from OMI")):
 
         return RedirectResponse(url=auth_url)
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        logger.exception("OAuth init failed for uid %s", uid)
         raise HTTPException(status_code=500, detail=f"OAuth initialization failed: {str(e)}")
 
 
@@ -1265,68 +1062,32 @@ async def auth_callback(
 ):
     """Handle OAuth callback from GitHub."""
     if not code or not state:
-        return HTMLResponse(
-            content=f"""
-            <html>
-                <head>
-                    <meta name="viewport" content="width=device-width, initial-scale=1">
-                    <style>{get_mobile_css()}</style>
-                </head>
-                <body>
-                    <div class="container">
-                        <div class="error-box" style="margin-top: 40px; padding: 40px 24px;">
-                            <h2 style="font-size: 24px; margin-bottom: 12px;">Authentication Failed</h2>
-                            <p style="margin-bottom: 0;">Authorization code not received. Please try again.</p>
-                        </div>
-                    </div>
-                </body>
-            </html>
-            """,
-            status_code=400
-        )
+        return html_response(request, MISSING_CODE_PAGE, MISSING_CODE_PAGE_GZ, status_code=400)
 
     # Verify state and get uid
     uid = oauth_states.get(state)
     if not uid:
-        return HTMLResponse(
-            content=f"""
-            <html>
-                <head>
-                    <meta name="viewport" content="width=device-width, initial-scale=1">
-                    <style>{get_mobile_css()}</style>
-                </head>
-                <body>
-                    <div class="container">
-                        <div class="error-box" style="margin-top: 40px; padding: 40px 24px;">
-                            <h2 style="font-size: 24px; margin-bottom: 12px;">Invalid State</h2>
-                            <p style="margin-bottom: 0;">OAuth state mismatch. Please try again.</p>
-                        </div>
-                    </div>
-                </body>
-            </html>
-            """,
-            status_code=400
-        )
+        return html_response(request, STATE_MISMATCH_PAGE, STATE_MISMATCH_PAGE_GZ, status_code=400)
 
     try:
         # Exchange code for access token
-        token_data = github_client.exchange_code_for_token(code)
+        token_data = await github_client.exchange_code_for_token(code)
         access_token = token_data.get("access_token")
 
-        # Get user info
-        user_info = github_client.get_user_info(access_token)
+        # User info and repositories only need the token: fetch them together
+        user_info, repos = await asyncio.gather(
+            github_client.get_user_info(access_token),
+            github_client.list_user_repos(access_token)
+        )
         github_username = user_info.get("login", "Unknown")
 
-        # Get user's repositories
-        repos = github_client.list_user_repos(access_token)
-
         # Save user data
         SimpleUserStorage.save_user(
             uid=uid,
             access_token=access_token,
             github_username=github_username,
             selected_repo=repos[0]["full_name"] if repos else None,
-            available_repos=repos
+            available_repos=stored_repos(repos)
         )
 
         # Clean up state
@@ -1334,69 +1095,22 @@ async def auth_callback(
             del oauth_states[state]
 
         return HTMLResponse(
-            content=f"""
-            <html>
-                <head>
-                    <meta name="viewport" content="width=device-width, initial-scale=1">
-                    <title>Connected Successfully!</title>
-                    <style>
-                        {get_mobile_css()}
-                    </style>
-                </head>
-                <body>
-                    <div class="container">
-                        <div class="success-box" style="padding: 40px 24px;">
-                            <div class="icon" style="font-size: 72px;">🎉</div>
-                            <h2 style="font-size: 28px; margin: 16px 0;">Successfully Connected!</h2>
-                            <p style="font-size: 17px; margin: 12px 0;">
-                                Your GitHub account <strong>@{github_username}</strong> is now linked
-                            </p>
-                            <p style="font-size: 16px; margin: 8px 0;">
-                                Found <strong>{len(repos)}</strong> {('repository' if len(repos) == 1 else 'repositories')}
-                            </p>
-                        </div>
-
-                        <a href="/?uid={uid}" class="btn btn-primary btn-block" style="font-size: 17px; padding: 16px; margin-top: 24px;">
-                            Continue to Settings
-                        </a>
-
-                        <div class="card" style="margin-top: 20px; text-align: center;">
-                            <h3>Ready to Go!</h3>
-                            <p style="font-size: 16px; line-height: 1.8;">
-                                You can now manage GitHub issues by chatting with Omi.
-                                <br><br>
-                                Try saying:<br>
-                                <strong>"Create an issue for..."</strong> or
-                                <strong>"Show me open issues"</strong>
-                            </p>
-                        </div>
-                    </div>
-                </body>
-            </html>
-            """
+            content=OAUTH_SUCCESS_PAGE.substitute(
+                uid=quote(uid, safe=''),
+                github_username=escape(github_username),
+                repo_count=len(repos),
+                repo_noun='repository' if len(repos) == 1 else 'repositories'
+            )
         )
 
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        logger.exception("OAuth callback failed for uid %s", uid)
         return HTMLResponse(
-            content=f"""
-            <html>
-                <head>
-                    <meta name="viewport" content="width=device-width, initial-scale=1">
-                    <style>{get_mobile_css()}</style>
-                </head>
-                <body>
-                    <div class="container">
-                        <div class="error-box" style="margin-top: 40px; padding: 40px 24px;">
-                            <h2 style="font-size: 24px; margin-bottom: 12px;">Authentication Error</h2>
-                            <p style="margin-bottom: 16px;">Failed to complete authentication: {str(e)}</p>
-                            <a href="/auth?uid={uid}" class="btn btn-primary">Try again</a>
-                        </div>
-                    </div>
-                </body>
-            </html>
-            """,
+            content=render_error(
+                "Authentication Error",
+                f"Failed to complete authentication: {str(e)}",
+                retry_href=f"/auth?uid={quote(uid, safe='')}"
+            ),
             status_code=500
         )
 
@@ -1407,37 +1121,34 @@ async def check_setup(uid: str = Query(..., description="User ID from OMI")):
     is_authenticated = SimpleUserStorage.is_authenticated(uid)
     has_repo = SimpleUserStorage.has_selected_repo(uid)
 
-    return {
+    return ORJSONResponse({
         "is_setup_completed": is_authenticated and has_repo
-    }
+    })
 
 
 @app.post("/update-repo")
-async def update_repo(
-    uid: str = Query(...),
-    repo: str = Query(...)
-):
+async def update_repo(body: RepoSelectionIn):
     """Update user's selected repository."""
+    uid, repo = body.uid, body.repo
     try:
         success = SimpleUserStorage.update_repo_selection(uid, repo)
         if success:
-            return {"success": True, "message": f"Repository updated to {repo}"}
+            return ORJSONResponse({"success": True, "message": f"Repository updated to {repo}"})
         else:
-            return {"success": False, "error": "User not found"}
+            return ORJSONResponse({"success": False, "error": "User not found"})
     except Exception as e:
-        return {"success": False, "error": str(e)}
+        return ORJSONResponse({"success": False, "error": str(e)})
 
 
 @app.post("/refresh-repos")
-async def refresh_repos(uid: str = Query(...)):
+async def refresh_repos(uid: str = Query(...), user: dict = Depends(current_user)):
     """Refresh user's repository list from GitHub."""
     try:
-        user = SimpleUserStorage.get_user(uid)
-        if not user or not user.get("access_token"):
-            return {"success": False, "error": "User not authenticated"}
+        if not has_github_token(user):
+            return ORJSONResponse({"success": False, "error": "User not authenticated"})
 
         # Fetch fresh repo list
-        repos = github_client.list_user_repos(user["access_token"])
+        repos = await github_client.list_user_repos(user["access_token"])
 
         # Update storage
         SimpleUserStorage.save_user(
@@ -1445,37 +1156,36 @@ async def refresh_repos(uid: str = Query(...)):
             access_token=user["access_token"],
             github_username=user.get("github_username"),
             selected_repo=user.get("selected_repo"),
-            available_repos=repos
+            available_repos=stored_repos(repos)
         )
 
-        return {"success": True, "repos_count": len(repos)}
+        return ORJSONResponse({"success": True, "repos_count": len(repos)})
     except Exception as e:
-        return {"success": False, "error": str(e)}
+        return ORJSONResponse({"success": False, "error": str(e)})
 
 
 @app.post("/check-repo-access")
 async def check_repo_access(
-    uid: str = Query(...),
-    repo: str = Query(None)
+    repo: str = Query(None),
+    user: dict = Depends(current_user)
 ):
     """Check authenticated user's permissions for a repository."""
     try:
-        user = SimpleUserStorage.get_user(uid)
-        if not user or not user.get("access_token"):
-            return {"success": False, "error": "User not authenticated"}
+        if not has_github_token(user):
+            return ORJSONResponse({"success": False, "error": "User not authenticated"})
 
         repo_full_name, error = get_repo_for_request(user, repo)
         if error:
-            return {"success": False, "error": error}
+            return ORJSONResponse({"success": False, "error": error})
 
-        permissions = github_client.get_repo_permissions(user["access_token"], repo_full_name)
+        permissions = await github_client.get_repo_permissions(user["access_token"], repo_full_name)
         if not permissions:
-            return {"success": False, "error": "Could not fetch repo permissions"}
+            return ORJSONResponse({"success": False, "error": "Could not fetch repo permissions"})
         if permissions.get("_error"):
-            return {
+            return ORJSONResponse({
                 "success": False,
                 "error": f"GitHub permissions check failed ({permissions.get('_status')}): {permissions.get('_error')}"
-            }
+            })
 
         if permissions.get("admin"):
             level = "admin"
@@ -1486,61 +1196,57 @@ async def check_repo_access(
         else:
             level = "none"
 
-        return {
+        return ORJSONResponse({
             "success": True,
             "repo": repo_full_name,
             "permissions": permissions,
             "message": f"{level} access"
-        }
+        })
     except Exception as e:
-        return {"success": False, "error": str(e)}
+        return ORJSONResponse({"success": False, "error": str(e)})
 
 
 @app.post("/save-agent-provider")
 async def save_agent_provider(
     uid: str = Query(...),
-    provider: str = Query(...)
+    provider: str = Query(...),
+    user: dict = Depends(current_user)
 ):
     """Save user's agent provider selection."""
     try:
         provider = provider.lower().strip()
         if provider not in PROVIDERS:
-            return {"success": False, "error": "Unsupported provider"}
+            return ORJSONResponse({"success": False, "error": "Unsupported provider"})
 
-        user = SimpleUserStorage.get_user(uid)
         if not user:
             SimpleUserStorage.save_user(uid=uid, access_token="", github_username="", selected_repo="", available_repos=[])
 
         success = SimpleUserStorage.save_agent_provider(uid, provider)
         if success:
-            return {"success": True, "message": "Agent provider saved"}
-        return {"success": False, "error": "Failed to save"}
+            return ORJSONResponse({"success": True, "message": "Agent provider saved"})
+        return ORJSONResponse({"success": False, "error": "Failed to save"})
     except Exception as e:
-        return {"success": False, "error": str(e)}
+        return ORJSONResponse({"success": False, "error": str(e)})
 
 
 @app.post("/save-agent-key")
-async def save_agent_key(
-    uid: str = Query(...),
-    provider: str = Query(...),
-    key: str = Query(...)
-):
-    """Save user's API key for an agent provider."""
+async def save_agent_key(body: AgentKeyIn):
+    """Save user's API key for an agent provider (JSON body, never the query string)."""
+    uid = body.uid
     try:
-        provider = provider.lower().strip()
+        provider = body.provider.lower().strip()
         if provider not in PROVIDERS:
-            return {"success": False, "error": "Unsupported provider"}
+            return ORJSONResponse({"success": False, "error": "Unsupported provider"})
 
-        user = SimpleUserStorage.get_user(uid)
-        if not user:
+        if not SimpleUserStorage.get_user(uid):
             SimpleUserStorage.save_user(uid=uid, access_token="", github_username="", selected_repo="", available_repos=[])
 
-        success = SimpleUserStorage.save_agent_api_key(uid, provider, key)
+        success = SimpleUserStorage.save_agent_api_key(uid, provider, body.key.strip())
         if success:
-            return {"success": True, "message": "Agent API key saved"}
-        return {"success": False, "error": "Failed to save"}
+            return ORJSONResponse({"success": True, "message": "Agent API key saved"})
+        return ORJSONResponse({"success": False, "error": "Failed to save"})
     except Exception as e:
-        return {"success": False, "error": str(e)}
+        return ORJSONResponse({"success": False, "error": str(e)})
 
 
 @app.post("/delete-agent-key")
@@ -1552,21 +1258,21 @@ async def delete_agent_key(
     try:
         provider = provider.lower().strip()
         if provider not in PROVIDERS:
-            return {"success": False, "error": "Unsupported provider"}
+            return ORJSONResponse({"success": False, "error": "Unsupported provider"})
 
         success = SimpleUserStorage.delete_agent_api_key(uid, provider)
         if success:
-            return {"success": True, "message": "Agent API key deleted"}
-        return {"success": False, "error": "Key not found"}
+            return ORJSONResponse({"success": True, "message": "Agent API key deleted"})
+        return ORJSONResponse({"success": False, "error": "Key not found"})
     except Exception as e:
-        return {"success": False, "error": str(e)}
+        return ORJSONResponse({"success": False, "error": str(e)})
 
 
 @app.post("/test-agent")
 async def test_agent(request: Request):
     """Send a direct test command to the selected agent provider."""
     try:
-        body = await request.json()
+        body = await read_json(request)
         uid = body.get("uid")
         prompt = body.get("prompt")
         repo = body.get("repo")
@@ -1577,14 +1283,14 @@ async def test_agent(request: Request):
             return {"success": False, "error": "User ID and prompt are required"}
 
         user = SimpleUserStorage.get_user(uid)
-        if not user or not user.get("access_token"):
+        if not has_github_token(user):
             return {"success": False, "error": "User not authenticated"}
 
         repo_full_name, error = get_repo_for_request(user, repo)
         if error:
             return {"success": False, "error": error}
 
-        permissions = github_client.get_repo_permissions(user["access_token"], repo_full_name)
+        permissions = await github_client.get_repo_permissions(user["access_token"], repo_full_name)
         if not permissions or not (permissions.get("push") or permissions.get("admin")):
             return {
                 "success": False,
@@ -1593,13 +1299,15 @@ async def test_agent(request: Request):
 
         import time
         logs = []
+        # Provider and keys come from the user record already loaded above
+        agent_api_keys = user.get("agent_api_keys", {})
 
-        providers_to_run = list(PROVIDERS.keys()) if send_all else [provider_override or SimpleUserStorage.get_agent_provider(uid) or os.getenv("DEFAULT_AGENT_PROVIDER", "cursor")]
+        providers_to_run = list(PROVIDERS.keys()) if send_all else [provider_override or user.get("agent_provider") or os.getenv("DEFAULT_AGENT_PROVIDER", "cursor")]
 
         for provider_name in providers_to_run:
             agent_provider = provider_name if provider_name in PROVIDERS else "cursor"
             provider_label = get_provider_label(agent_provider)
-            provider_key = SimpleUserStorage.get_agent_api_key(uid, agent_provider) or get_provider_default_key(agent_provider)
+            provider_key = agent_api_keys.get(agent_provider) or get_provider_default_key(agent_provider)
             if not provider_key:
                 env_key = PROVIDERS[agent_provider]["env_key"]
                 logs.append({
@@ -1610,7 +1318,8 @@ async def test_agent(request: Request):
                 continue
 
             branch_name = f"{agent_provider}-test-{int(time.time())}"
-            result = run_agent_provider(
+            result = await asyncio.to_thread(
+                run_agent_provider,
                 provider=agent_provider,
                 repo_full_name=repo_full_name,
                 feature_description=prompt,
@@ -1671,32 +1380,31 @@ async def test_agent(request: Request):
 
 
 @app.post("/tools/code_feature", tags=["chat_tools"], response_model=ChatToolResponse)
-async def tool_code_feature(request: Request):
+async def tool_code_feature(body: ToolCodeIn):
     """
     AI-powered coding tool - implement features using Claude.
     """
     try:
-        body = await request.json()
-        uid = body.get("uid")
-        feature = body.get("feature")
-        repo = body.get("repo")  # Optional: owner/repo format
-        merge = body.get("merge", False)  # Optional: merge PR after creation
+        uid = body.uid
+        feature = body.feature
+        repo = body.repo
+        merge = body.merge
 
         if not uid or not feature:
             return ChatToolResponse(error="User ID and feature description are required")
 
         user = SimpleUserStorage.get_user(uid)
-        if not user or not user.get("access_token"):
+        if not has_github_token(user):
             return ChatToolResponse(
                 error="Please connect your GitHub account first in the app settings."
             )
 
-        agent_provider = SimpleUserStorage.get_agent_provider(uid) or os.getenv("DEFAULT_AGENT_PROVIDER", "cursor")
+        agent_provider = user.get("agent_provider") or os.getenv("DEFAULT_AGENT_PROVIDER", "cursor")
         if agent_provider not in PROVIDERS:
             agent_provider = "cursor"
 
         provider_label = get_provider_label(agent_provider)
-        provider_key = SimpleUserStorage.get_agent_api_key(uid, agent_provider) or get_provider_default_key(agent_provider)
+        provider_key = user.get("agent_api_keys", {}).get(agent_provider) or get_provider_default_key(agent_provider)
         if not provider_key:
             env_key = PROVIDERS[agent_provider]["env_key"]
             return ChatToolResponse(
@@ -1710,14 +1418,16 @@ async def tool_code_feature(request: Request):
                 error="No repository specified. Please set a default repository in settings."
             )
 
-        permissions = github_client.get_repo_permissions(user["access_token"], repo_full_name)
-        if not permissions:
+        # One repo fetch covers the permission check and the PR base branch
+        repo_info = await github_client.get_repo(user["access_token"], repo_full_name)
+        if repo_info and repo_info.get("_error"):
             return ChatToolResponse(
-                error="Could not fetch repo permissions. Please re-authenticate GitHub."
+                error=f"GitHub permissions check failed ({repo_info.get('_status')}): {repo_info.get('_error')}"
             )
-        if permissions.get("_error"):
+        permissions = repo_info["permissions"] if repo_info else None
+        if not permissions:
             return ChatToolResponse(
-                error=f"GitHub permissions check failed ({permissions.get('_status')}): {permissions.get('_error')}"
+                error="Could not fetch repo permissions. Please re-authenticate GitHub."
             )
         if not (permissions.get("push") or permissions.get("admin")):
             return ChatToolResponse(
@@ -1728,19 +1438,14 @@ async def tool_code_feature(request: Request):
             )
 
         # Start coding session with external agent provider
-        from claude_code_cli import (
-            create_pr_with_github_api,
-            merge_pr_with_github_api,
-            get_default_branch
-        )
         import time
 
-        owner, repo_name = repo_full_name.split('/')
         branch_name = f"{agent_provider}-agent-{int(time.time())}"
 
-        log(f"Running {provider_label} on {repo_full_name} to implement: {feature}")
+        logger.info("Running %s on %s to implement: %s", provider_label, repo_full_name, feature)
 
-        result = run_agent_provider(
+        result = await asyncio.to_thread(
+            run_agent_provider,
             provider=agent_provider,
             repo_full_name=repo_full_name,
             feature_description=feature,
@@ -1754,7 +1459,7 @@ async def tool_code_feature(request: Request):
             return ChatToolResponse(error=f"Failed to implement feature: {result.get('message')}")
 
         data = result.get("data") or {}
-        default_branch = data.get("default_branch") or get_default_branch(owner, repo_name, user["access_token"])
+        default_branch = data.get("default_branch") or repo_info["default_branch"]
         returned_branch = data.get("branch") or branch_name
 
         # Provider-specific parsing
@@ -1781,15 +1486,14 @@ async def tool_code_feature(request: Request):
                     result=f"✅ **Feature implemented and merged!**\n\n**Pull Request:** {pr_url}\n\nThe changes have been merged into `{default_branch}`. ✅"
                 )
             if merge:
-                log(f"Merging PR #{pr_number}...")
-                merged = merge_pr_with_github_api(
-                    owner=owner,
-                    repo=repo_name,
+                logger.info("Merging PR #%s...", pr_number)
+                merge_result = await github_client.merge_pull_request(
+                    access_token=user["access_token"],
+                    repo_full_name=repo_full_name,
                     pr_number=pr_number,
-                    github_token=user["access_token"],
-                    merge_method='squash'
+                    merge_method="squash"
                 )
-                if merged:
+                if merge_result.get("success"):
                     return ChatToolResponse(
                         result=f"✅ **Feature implemented and merged!**\n\n**Pull Request:** {pr_url}\n\nThe changes have been merged into `{default_branch}`. ✅"
                     )
@@ -1822,14 +1526,13 @@ async def tool_code_feature(request: Request):
 *Generated by {provider_label} via Omi*
 """
 
-        pr_result = create_pr_with_github_api(
-            owner=owner,
-            repo=repo_name,
-            branch=returned_branch,
+        pr_result = await github_client.create_pull_request(
+            access_token=user["access_token"],
+            repo_full_name=repo_full_name,
+            head=returned_branch,
+            base=default_branch,
             title=pr_title,
-            body=pr_body,
-            github_token=user["access_token"],
-            base_branch=default_branch
+            body=pr_body
         )
 
         if pr_result:
@@ -1837,15 +1540,14 @@ async def tool_code_feature(request: Request):
             pr_number = pr_result["pr_number"]
 
             if merge:
-                log(f"Merging PR #{pr_number}...")
-                merged = merge_pr_with_github_api(
-                    owner=owner,
-                    repo=repo_name,
+                logger.info("Merging PR #%s...", pr_number)
+                merge_result = await github_client.merge_pull_request(
+                    access_token=user["access_token"],
+                    repo_full_name=repo_full_name,
                     pr_number=pr_number,
-                    github_token=user["access_token"],
-                    merge_method='squash'
+                    merge_method="squash"
                 )
-                if merged:
+                if merge_result.get("success"):
                     return ChatToolResponse(
                         result=f"✅ **Feature implemented and merged!**\n\n**Pull Request:** {pr_url}\n\nThe changes have been merged into `{default_branch}`. ✅"
                     )
@@ -1862,278 +1564,18 @@ async def tool_code_feature(request: Request):
         )
 
     except Exception as e:
-        import traceback
-        log(f"Error in code_feature tool: {e}")
-        log(traceback.format_exc())
+        logger.exception("Error in code_feature tool: %s", e)
         return ChatToolResponse(error=f"Failed to implement feature: {str(e)}")
 
 
+# Constant payload: serialized once, not per probe
+_HEALTH_BODY = orjson.dumps({"status": "healthy", "service": "omi-github-issues"})
+
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
-    return {"status": "healthy", "service": "omi-github-issues"}
-
-
-# ============================================
-# CSS Styles
-# ============================================
-
-def get_mobile_css() -> str:
-    """Returns GitHub dark theme inspired CSS styles."""
-    return """
-        * {
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }
-
-        body {
-            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', 'Roboto', 'Helvetica Neue', Arial, sans-serif;
-            background: #0d1117;
-            color: #c9d1d9;
-            min-height: 100vh;
-            padding: 20px;
-            line-height: 1.6;
-        }
-
-        .container {
-            max-width: 650px;
-            margin: 0 auto;
-        }
-
-        .icon {
-            font-size: 64px;
-            text-align: center;
-            margin-bottom: 20px;
-        }
-
-        h1 {
-            color: #c9d1d9;
-            font-size: 32px;
-            font-weight: 600;
-            text-align: center;
-            margin-bottom: 12px;
-        }
-
-        h2 {
-            color: #c9d1d9;
-            font-size: 24px;
-            font-weight: 600;
-            margin-bottom: 15px;
-            border-bottom: 1px solid #21262d;
-            padding-bottom: 10px;
-        }
-
-        h3 {
-            color: #c9d1d9;
-            font-size: 19px;
-            font-weight: 600;
-            margin-bottom: 12px;
-        }
-
-        p {
-            color: #8b949e;
-            text-align: center;
-            margin-bottom: 24px;
-            font-size: 16px;
-        }
-
-        .username {
-            color: #58a6ff;
-            font-weight: 600;
-            font-size: 18px;
-        }
-
-        .card {
-            background: #161b22;
-            border-radius: 6px;
-            padding: 24px;
-            margin-bottom: 16px;
-            border: 1px solid #30363d;
-        }
-
-        .btn {
-            display: inline-block;
-            padding: 9px 20px;
-            border-radius: 6px;
-            text-decoration: none;
-            font-weight: 500;
-            font-size: 14px;
-            border: 1px solid;
-            cursor: pointer;
-            transition: all 0.2s ease-in-out;
-            margin: 8px 8px 8px 0;
-            text-align: center;
-            line-height: 20px;
-        }
-
-        .btn-primary {
-            background: #238636;
-            color: #ffffff;
-            border-color: #238636;
-        }
-
-        .btn-primary:hover {
-            background: #2ea043;
-            border-color: #2ea043;
-        }
-
-        .btn-secondary {
-            background: transparent;
-            color: #c9d1d9;
-            border-color: #30363d;
-        }
-
-        .btn-secondary:hover {
-            background: #30363d;
-            border-color: #8b949e;
-        }
-
-        .btn-block {
-            display: block;
-            width: 100%;
-            text-align: center;
-        }
-
-        .repo-select {
-            width: 100%;
-            padding: 9px 12px;
-            border: 1px solid #30363d;
-            border-radius: 6px;
-            font-size: 14px;
-            margin-bottom: 18px;
-            font-family: inherit;
-            background: #0d1117;
-            color: #c9d1d9;
-            cursor: pointer;
-        }
-
-        .repo-select:focus {
-            outline: none;
-            border-color: #58a6ff;
-            box-shadow: 0 0 0 3px rgba(88, 166, 255, 0.3);
-        }
-
-        .steps {
-            margin: 20px 0;
-        }
-
-        .step {
-            display: flex;
-            margin: 18px 0;
-            align-items: flex-start;
-            padding: 12px;
-            border-radius: 6px;
-        }
-
-        .step-number {
-            background: #238636;
-            color: white;
-            width: 32px;
-            height: 32px;
-            border-radius: 50%;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            font-weight: 600;
-            margin-right: 14px;
-            flex-shrink: 0;
-            font-size: 14px;
-        }
-
-        .step-content {
-            flex: 1;
-            padding-top: 4px;
-            font-size: 14px;
-            line-height: 1.6;
-            color: #8b949e;
-        }
-
-        .step-content strong {
-            color: #c9d1d9;
-        }
-
-        .example {
-            background: #0d1117;
-            padding: 12px 16px;
-            border-radius: 6px;
-            margin: 8px 0;
-            font-size: 14px;
-            border: 1px solid #30363d;
-            color: #8b949e;
-            font-style: italic;
-        }
-
-        .success-box {
-            background: rgba(35, 134, 54, 0.15);
-            color: #3fb950;
-            padding: 24px;
-            border-radius: 6px;
-            margin: 18px 0;
-            text-align: center;
-            border: 1px solid #238636;
-        }
-
-        .error-box {
-            background: rgba(248, 81, 73, 0.15);
-            color: #f85149;
-            padding: 18px;
-            border-radius: 6px;
-            margin: 14px 0;
-            border: 1px solid #f85149;
-        }
-
-        ul {
-            margin-left: 20px;
-        }
-
-        li {
-            margin: 8px 0;
-            color: #8b949e;
-        }
-
-        strong {
-            color: #c9d1d9;
-            font-weight: 600;
-        }
-
-        .footer {
-            text-align: center;
-            color: #8b949e;
-            margin-top: 40px;
-            padding: 20px;
-            font-size: 14px;
-            border-top: 1px solid #21262d;
-        }
-
-        .footer strong {
-            color: #58a6ff;
-        }
-
-        @media (max-width: 480px) {
-            body {
-                padding: 12px;
-            }
-
-            .card {
-                padding: 18px;
-            }
-
-            h1 {
-                font-size: 26px;
-            }
-
-            .btn {
-                display: block;
-                width: 100%;
-                margin: 10px 0;
-            }
-
-            .icon {
-                font-size: 52px;
-            }
-        }
-    """
+    return Response(content=_HEALTH_BODY, media_type="application/json")
 
 
 # ============================================
@@ -2151,9 +1593,16 @@ if __name__ == "__main__":
     print(f"Starting on {host}:{port}")
     print("=" * 50)
 
+    # Auto-reload is for local development only: its file watcher and
+    # supervisor process have no place in production (APP_RELOAD=1 to enable).
+    # More than one worker splits the in-memory OAuth states and the
+    # users.json writer across processes, so APP_WORKERS defaults to 1.
+    # uvicorn[standard] brings uvloop and httptools, which the default
+    # "auto" loop/http settings pick up.
     uvicorn.run(
         "main:app",
         host=host,
         port=port,
-        reload=True
+        reload=os.getenv("APP_RELOAD", "0") == "1",
+        workers=int(os.getenv("APP_WORKERS", "1"))
     )
@@ -2,7 +2,7 @@
 Pydantic models for the GitHub Omi plugin.
 """
 from typing import List, Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class ChatToolResponse(BaseModel):
@@ -11,6 +11,28 @@ class ChatToolResponse(BaseModel):
     error: Optional[str] = None
 
 
+class RepoSelectionIn(BaseModel):
+    """Body for /update-repo."""
+    uid: str = Field(..., max_length=256)
+    repo: str = Field(..., min_length=3, max_length=200)
+
+
+class AgentKeyIn(BaseModel):
+    """Body for /save-agent-key (keeps the secret out of URLs and proxy logs)."""
+    uid: str = Field(..., max_length=256)
+    provider: str = Field(..., max_length=32)
+    key: str = Field(..., min_length=1, max_length=1024)
+
+
+class ToolCodeIn(BaseModel):
+    """Body for the code_feature chat tool (uid/feature are optional so a
+    missing or null value gets the tool's own error message, not a 422)."""
+    uid: Optional[str] = Field(None, max_length=256)
+    feature: Optional[str] = None
+    repo: Optional[str] = Field(None, max_length=200)  # owner/repo, else the selected repo
+    merge: bool = False  # merge the PR after creating it
+
+
 class GitHubRepo(BaseModel):
     """GitHub repository information."""
     name: str
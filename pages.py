@@ -0,0 +1,884 @@
+"""
+HTML pages for the OAuth flow and settings screen.
+
+Each page is a string.Template compiled once at import with the CSS already
+embedded; handlers only substitute the per-request values.
+"""
+import gzip
+import hashlib
+import os
+import re
+from html import escape
+from string import Template
+from typing import Optional
+
+import orjson
+
+
+def js_literal(value) -> str:
+    """
+    Encode a value as a JavaScript literal that is safe inside <script>.
+
+    JSON is valid JS; escaping "<" keeps a value like "</script>" from
+    closing the script element early.
+    """
+    return orjson.dumps(value).decode("utf-8").replace("<", "\\u003c")
+
+
+# GitHub dark theme inspired CSS shared by every page (readable source;
+# pages embed the minified _MOBILE_CSS below)
+_MOBILE_CSS_SOURCE = """
+        * {
+            margin: 0;
+            padding: 0;
+            box-sizing: border-box;
+        }
+
+        body {
+            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', 'Roboto', 'Helvetica Neue', Arial, sans-serif;
+            background: #0d1117;
+            color: #c9d1d9;
+            min-height: 100vh;
+            padding: 20px;
+            line-height: 1.6;
+        }
+
+        .container {
+            max-width: 650px;
+            margin: 0 auto;
+        }
+
+        .icon {
+            font-size: 64px;
+            text-align: center;
+            margin-bottom: 20px;
+        }
+
+        h1 {
+            color: #c9d1d9;
+            font-size: 32px;
+            font-weight: 600;
+            text-align: center;
+            margin-bottom: 12px;
+        }
+
+        h2 {
+            color: #c9d1d9;
+            font-size: 24px;
+            font-weight: 600;
+            margin-bottom: 15px;
+            border-bottom: 1px solid #21262d;
+            padding-bottom: 10px;
+        }
+
+        h3 {
+            color: #c9d1d9;
+            font-size: 19px;
+            font-weight: 600;
+            margin-bottom: 12px;
+        }
+
+        p {
+            color: #8b949e;
+            text-align: center;
+            margin-bottom: 24px;
+            font-size: 16px;
+        }
+
+        .username {
+            color: #58a6ff;
+            font-weight: 600;
+            font-size: 18px;
+        }
+
+        .card {
+            background: #161b22;
+            border-radius: 6px;
+            padding: 24px;
+            margin-bottom: 16px;
+            border: 1px solid #30363d;
+        }
+
+        .btn {
+            display: inline-block;
+            padding: 9px 20px;
+            border-radius: 6px;
+            text-decoration: none;
+            font-weight: 500;
+            font-size: 14px;
+            border: 1px solid;
+            cursor: pointer;
+            transition: all 0.2s ease-in-out;
+            margin: 8px 8px 8px 0;
+            text-align: center;
+            line-height: 20px;
+        }
+
+        .btn-primary {
+            background: #238636;
+            color: #ffffff;
+            border-color: #238636;
+        }
+
+        .btn-primary:hover {
+            background: #2ea043;
+            border-color: #2ea043;
+        }
+
+        .btn-secondary {
+            background: transparent;
+            color: #c9d1d9;
+            border-color: #30363d;
+        }
+
+        .btn-secondary:hover {
+            background: #30363d;
+            border-color: #8b949e;
+        }
+
+        .btn-block {
+            display: block;
+            width: 100%;
+            text-align: center;
+        }
+
+        .repo-select {
+            width: 100%;
+            padding: 9px 12px;
+            border: 1px solid #30363d;
+            border-radius: 6px;
+            font-size: 14px;
+            margin-bottom: 18px;
+            font-family: inherit;
+            background: #0d1117;
+            color: #c9d1d9;
+            cursor: pointer;
+        }
+
+        .repo-select:focus {
+            outline: none;
+            border-color: #58a6ff;
+            box-shadow: 0 0 0 3px rgba(88, 166, 255, 0.3);
+        }
+
+        .steps {
+            margin: 20px 0;
+        }
+
+        .step {
+            display: flex;
+            margin: 18px 0;
+            align-items: flex-start;
+            padding: 12px;
+            border-radius: 6px;
+        }
+
+        .step-number {
+            background: #238636;
+            color: white;
+            width: 32px;
+            height: 32px;
+            border-radius: 50%;
+            display: flex;
+            align-items: center;
+            justify-content: center;
+            font-weight: 600;
+            margin-right: 14px;
+            flex-shrink: 0;
+            font-size: 14px;
+        }
+
+        .step-content {
+            flex: 1;
+            padding-top: 4px;
+            font-size: 14px;
+            line-height: 1.6;
+            color: #8b949e;
+        }
+
+        .step-content strong {
+            color: #c9d1d9;
+        }
+
+        .example {
+            background: #0d1117;
+            padding: 12px 16px;
+            border-radius: 6px;
+            margin: 8px 0;
+            font-size: 14px;
+            border: 1px solid #30363d;
+            color: #8b949e;
+            font-style: italic;
+        }
+
+        .success-box {
+            background: rgba(35, 134, 54, 0.15);
+            color: #3fb950;
+            padding: 24px;
+            border-radius: 6px;
+            margin: 18px 0;
+            text-align: center;
+            border: 1px solid #238636;
+        }
+
+        .error-box {
+            background: rgba(248, 81, 73, 0.15);
+            color: #f85149;
+            padding: 18px;
+            border-radius: 6px;
+            margin: 14px 0;
+            border: 1px solid #f85149;
+        }
+
+        ul {
+            margin-left: 20px;
+        }
+
+        li {
+            margin: 8px 0;
+            color: #8b949e;
+        }
+
+        strong {
+            color: #c9d1d9;
+            font-weight: 600;
+        }
+
+        .footer {
+            text-align: center;
+            color: #8b949e;
+            margin-top: 40px;
+            padding: 20px;
+            font-size: 14px;
+            border-top: 1px solid #21262d;
+        }
+
+        .footer strong {
+            color: #58a6ff;
+        }
+
+        @media (max-width: 480px) {
+            body {
+                padding: 12px;
+            }
+
+            .card {
+                padding: 18px;
+            }
+
+            h1 {
+                font-size: 26px;
+            }
+
+            .btn {
+                display: block;
+                width: 100%;
+                margin: 10px 0;
+            }
+
+            .icon {
+                font-size: 52px;
+            }
+        }
+    """
+
+
+def _minify_css(css: str) -> str:
+    """Strip comments and the whitespace around CSS punctuation, and drop each block's last ';'."""
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.DOTALL)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r" ?([{};,]) ?", r"\1", css)
+    css = re.sub(r": ", ":", css)
+    return css.replace(";}", "}").strip()
+
+
+_MOBILE_CSS = _minify_css(_MOBILE_CSS_SOURCE)
+
+# The same stylesheet as a standalone asset (/static/mobile.css), encoded
+# and gzip-compressed once
+MOBILE_CSS_BYTES = _MOBILE_CSS.encode("utf-8")
+MOBILE_CSS_GZ = gzip.compress(MOBILE_CSS_BYTES, 9)
+MOBILE_CSS_HASH = hashlib.sha256(MOBILE_CSS_BYTES).hexdigest()[:16]
+# Strong validators differ per representation, so the gzip body gets its own
+MOBILE_CSS_ETAG = f'"{MOBILE_CSS_HASH}"'
+MOBILE_CSS_GZ_ETAG = f'"{MOBILE_CSS_HASH}-gzip"'
+
+
+def get_mobile_css() -> bytes:
+    """Returns GitHub dark theme inspired CSS styles, already UTF-8 encoded.
+
+    Page templates embed the str form (_MOBILE_CSS) at import instead.
+    """
+    return MOBILE_CSS_BYTES
+
+
+# Inline the CSS into each page (default: no extra request on first paint).
+# OMI_INLINE_CSS=0 links /static/mobile.css instead, which repeat visitors
+# revalidate with a 304.
+INLINE_CSS = os.getenv("OMI_INLINE_CSS", "1") != "0"
+
+_STYLE_BLOCK_RE = re.compile(r"<style>\s*\$css\s*</style>")
+
+
+def _page(source: str) -> Template:
+    """Compile a page template with the shared CSS already filled in (or linked)."""
+    if not INLINE_CSS:
+        source = _STYLE_BLOCK_RE.sub('<link rel="stylesheet" href="/static/mobile.css">', source)
+    return Template(Template(source).safe_substitute(css=_MOBILE_CSS))
+
+
+# Landing page for users who haven't connected GitHub yet
+# ($auth_url), HTML/URL-escaped by the caller
+UNAUTH_PAGE = _page("""
+<html>
+    <head>
+        <meta name="viewport" content="width=device-width, initial-scale=1">
+        <style>
+            $css
+        </style>
+    </head>
+    <body>
+        <div class="container">
+            <div class="icon">🐙</div>
+            <h1>GitHub Issues</h1>
+            <p style="font-size: 18px;">Create and manage GitHub issues through Omi chat</p>
+
+            <a href="$auth_url" class="btn btn-primary btn-block" style="font-size: 17px; padding: 16px;">
+                Connect GitHub Account
+            </a>
+
+            <div class="card">
+                <h3>How It Works</h3>
+                <div class="steps">
+                    <div class="step">
+                        <div class="step-number">1</div>
+                        <div class="step-content">
+                            <strong>Connect</strong> your GitHub account securely
+                        </div>
+                    </div>
+                    <div class="step">
+                        <div class="step-number">2</div>
+                        <div class="step-content">
+                            <strong>Select</strong> your default repository
+                        </div>
+                    </div>
+                    <div class="step">
+                        <div class="step-number">3</div>
+                        <div class="step-content">
+                            <strong>Chat</strong> with Omi to create and manage issues
+                        </div>
+                    </div>
+                </div>
+            </div>
+
+            <div class="card">
+                <h3>What You Can Do</h3>
+                <ul style="list-style: none; padding: 0;">
+                    <li style="padding: 10px 0; border-bottom: 1px solid #21262d;">
+                        <strong>Create Issues</strong> - Report bugs, request features
+                    </li>
+                    <li style="padding: 10px 0; border-bottom: 1px solid #21262d;">
+                        <strong>List Issues</strong> - View open/closed issues
+                    </li>
+                    <li style="padding: 10px 0; border-bottom: 1px solid #21262d;">
+                        <strong>Add Comments</strong> - Respond to issues
+                    </li>
+                    <li style="padding: 10px 0;">
+                        <strong>Auto-Labels</strong> - AI selects appropriate tags
+                    </li>
+                </ul>
+            </div>
+
+            <div class="footer">
+                <p>Powered by <strong>Omi</strong></p>
+            </div>
+        </div>
+    </body>
+</html>
+""")
+
+# Repository / agent settings for a connected user
+# ($uid_js, $github_username, $repo_options, $provider_options, $masked_agent_key,
+#  $provider_labels_js, $provider_keys_js). Values must already be escaped:
+# HTML-escaped for markup, JSON literals for the *_js script values.
+SETTINGS_PAGE = _page("""
+<html>
+    <head>
+        <meta name="viewport" content="width=device-width, initial-scale=1">
+        <title>GitHub Issues - Settings</title>
+        <style>
+            $css
+        </style>
+    </head>
+    <body>
+        <div class="container">
+            <div class="card" style="margin-top: 20px;">
+                <h2>Default Repository</h2>
+                <p style="text-align: left; font-size: 14px; margin-bottom: 8px; color: #8b949e;">
+                    Logged in as <span class="username">@$github_username</span>
+                </p>
+                <p style="text-align: left; font-size: 14px; margin-bottom: 16px;">
+                    Issues will be created here by default:
+                </p>
+
+                <select id="repoSelect" class="repo-select">
+                    $repo_options
+                </select>
+
+                <button class="btn btn-primary btn-block" onclick="updateRepo()">
+                    Save Repository
+                </button>
+                <button class="btn btn-secondary btn-block" onclick="refreshRepos()">
+                    Refresh Repositories
+                </button>
+                <button class="btn btn-secondary btn-block" onclick="checkRepoAccess()">
+                    Check Repo Access
+                </button>
+            </div>
+
+            <div class="card">
+                <h3>Agent Settings</h3>
+                <p style="text-align: left; font-size: 14px; margin-bottom: 16px;">
+                    Choose which coding agent to use and add its API key (optional).
+                </p>
+
+                <label style="display: block; text-align: left; font-size: 12px; color: #8b949e; margin-bottom: 6px;">
+                    Agent Provider
+                </label>
+                <select id="agentProviderSelect" class="repo-select" onchange="updateAgentPlaceholder()">
+                    $provider_options
+                </select>
+
+                <input type="password"
+                       id="agentKey"
+                       placeholder="API key for selected provider"
+                       style="width: 100%; padding: 12px; background: #0d1117; border: 1px solid #30363d; border-radius: 6px; color: #c9d1d9; font-size: 14px; margin-bottom: 12px;"
+                       value="$masked_agent_key">
+
+                <div style="display: flex; gap: 8px;">
+                    <button class="btn btn-secondary" onclick="saveAgentProvider()">
+                        Save Provider
+                    </button>
+                    <button class="btn btn-primary" onclick="saveAgentKey()" style="flex: 1;">
+                        Save API Key
+                    </button>
+                    <button class="btn btn-secondary" onclick="deleteAgentKey()">
+                        Remove
+                    </button>
+                </div>
+
+                <div style="margin-top: 16px;">
+                    <label style="display: block; text-align: left; font-size: 12px; color: #8b949e; margin-bottom: 6px;">
+                        Test Agent Command
+                    </label>
+                    <input type="text"
+                           id="agentTestPrompt"
+                           placeholder="e.g. Summarize repo structure"
+                           style="width: 100%; padding: 12px; background: #0d1117; border: 1px solid #30363d; border-radius: 6px; color: #c9d1d9; font-size: 14px; margin-bottom: 12px;">
+                    <label style="display: flex; align-items: center; gap: 8px; text-align: left; font-size: 12px; color: #8b949e; margin-bottom: 10px;">
+                        <input type="checkbox" id="agentTestAll" style="accent-color: #238636;">
+                        Send to all agents
+                    </label>
+                    <button class="btn btn-primary btn-block" onclick="sendAgentTest()">
+                        Send Test Command
+                    </button>
+                    <textarea id="agentTestLogs"
+                              readonly
+                              placeholder="Logs will appear here..."
+                              style="width: 100%; height: 140px; margin-top: 12px; padding: 12px; background: #0d1117; border: 1px solid #30363d; border-radius: 6px; color: #c9d1d9; font-size: 12px; resize: vertical;"></textarea>
+                </div>
+
+                <p style="text-align: left; font-size: 12px; color: #8b949e; margin-top: 12px;">
+                    Agent uses your GitHub OAuth token for repo access. Ensure you have write access.
+                </p>
+            </div>
+
+            <div class="card">
+                <h3>Using Chat Commands</h3>
+                <p style="text-align: left; margin-bottom: 16px;">
+                    Just chat with Omi naturally:
+                </p>
+                <div class="example">
+                    "Create an issue for the login bug"
+                </div>
+                <div class="example">
+                    "Show me recent issues"
+                </div>
+                <div class="example">
+                    "Add a comment to issue #42"
+                </div>
+            </div>
+
+            <div class="card">
+                <h3>Tips</h3>
+                <ul style="list-style: none; padding: 0;">
+                    <li style="padding: 8px 0;">
+                        <strong>Be specific</strong> - Include details in issue descriptions
+                    </li>
+                    <li style="padding: 8px 0;">
+                        <strong>Auto-labels</strong> - AI picks relevant labels automatically
+                    </li>
+                    <li style="padding: 8px 0;">
+                        <strong>Different repos</strong> - Specify repo name to override default
+                    </li>
+                </ul>
+            </div>
+
+            <div class="footer">
+                <p>Powered by <strong>Omi</strong></p>
+            </div>
+        </div>
+
+        <script>
+            const uid = $uid_js;
+
+            async function updateRepo() {
+                const select = document.getElementById('repoSelect');
+                const repo = select.value;
+
+                if (!repo || repo === 'No repositories found') {
+                    alert('Please select a valid repository');
+                    return;
+                }
+
+                try {
+                    const response = await fetch('/update-repo', {
+                        method: 'POST',
+                        headers: {
+                            'Content-Type': 'application/json'
+                        },
+                        body: JSON.stringify({
+                            uid,
+                            repo
+                        })
+                    });
+
+                    const data = await response.json();
+
+                    if (data.success) {
+                        alert('Repository updated successfully!');
+                    } else {
+                        alert('Failed to update: ' + data.error);
+                    }
+                } catch (error) {
+                    alert('Error: ' + error.message);
+                }
+            }
+
+            async function refreshRepos() {
+                if (!confirm('Refresh your repository list from GitHub?')) return;
+
+                try {
+                    const response = await fetch('/refresh-repos?uid=' + encodeURIComponent(uid), {
+                        method: 'POST'
+                    });
+
+                    const data = await response.json();
+
+                    if (data.success) {
+                        alert('Repositories refreshed! Reloading page...');
+                        window.location.reload();
+                    } else {
+                        alert('Failed to refresh: ' + data.error);
+                    }
+                } catch (error) {
+                    alert('Error: ' + error.message);
+                }
+            }
+
+            async function checkRepoAccess() {
+                const select = document.getElementById('repoSelect');
+                const repo = select.value;
+
+                if (!repo || repo === 'No repositories found') {
+                    alert('Please select a valid repository');
+                    return;
+                }
+
+                try {
+                    const response = await fetch('/check-repo-access?uid=' + encodeURIComponent(uid) + '&repo=' + encodeURIComponent(repo), {
+                        method: 'POST'
+                    });
+                    const data = await response.json();
+
+                    if (data.success) {
+                        alert('Repo access: ' + data.message);
+                    } else {
+                        alert('Access check failed: ' + data.error);
+                    }
+                } catch (error) {
+                    alert('Error: ' + error.message);
+                }
+            }
+
+            const agentProviderLabels = $provider_labels_js;
+            const agentProviderKeys = $provider_keys_js;
+
+            function getSelectedProvider() {
+                const select = document.getElementById('agentProviderSelect');
+                return select.value;
+            }
+
+            function updateAgentPlaceholder() {
+                const provider = getSelectedProvider();
+                const label = agentProviderLabels[provider] || 'Agent';
+                const input = document.getElementById('agentKey');
+                input.placeholder = label + ' API key';
+                input.value = agentProviderKeys[provider] || '';
+            }
+
+            async function saveAgentProvider() {
+                const provider = getSelectedProvider();
+                try {
+                    const response = await fetch('/save-agent-provider?uid=' + encodeURIComponent(uid) + '&provider=' + encodeURIComponent(provider), {
+                        method: 'POST'
+                    });
+                    const data = await response.json();
+
+                    if (data.success) {
+                        alert('Agent provider saved!');
+                    } else {
+                        alert('Failed to save: ' + data.error);
+                    }
+                } catch (error) {
+                    alert('Error: ' + error.message);
+                }
+            }
+
+            async function saveAgentKey() {
+                const provider = getSelectedProvider();
+                const keyInput = document.getElementById('agentKey');
+                const apiKey = keyInput.value.trim();
+
+                if (!apiKey) {
+                    alert('Please enter an API key');
+                    return;
+                }
+
+                try {
+                    const response = await fetch('/save-agent-key', {
+                        method: 'POST',
+                        headers: {
+                            'Content-Type': 'application/json'
+                        },
+                        body: JSON.stringify({
+                            uid,
+                            provider,
+                            key: apiKey
+                        })
+                    });
+                    const data = await response.json();
+
+                    if (data.success) {
+                        alert('API key saved successfully!');
+                    } else {
+                        alert('Failed to save: ' + (data.error || data.detail));
+                    }
+                } catch (error) {
+                    alert('Error: ' + error.message);
+                }
+            }
+
+            async function deleteAgentKey() {
+                const provider = getSelectedProvider();
+                if (!confirm('Remove the API key for this provider?')) return;
+
+                try {
+                    await fetch('/delete-agent-key?uid=' + encodeURIComponent(uid) + '&provider=' + encodeURIComponent(provider), {
+                        method: 'POST'
+                    });
+
+                    document.getElementById('agentKey').value = '';
+                    alert('API key removed successfully!');
+                } catch (error) {
+                    alert('Error: ' + error.message);
+                }
+            }
+
+
+            async function sendAgentTest() {
+                const promptInput = document.getElementById('agentTestPrompt');
+                const prompt = promptInput.value.trim();
+                const provider = getSelectedProvider();
+                const repo = document.getElementById('repoSelect').value;
+                const sendAll = document.getElementById('agentTestAll').checked;
+                const logsEl = document.getElementById('agentTestLogs');
+
+                if (!prompt) {
+                    alert('Please enter a test command');
+                    return;
+                }
+
+                try {
+                    const response = await fetch('/test-agent', {
+                        method: 'POST',
+                        headers: {
+                            'Content-Type': 'application/json'
+                        },
+                        body: JSON.stringify({
+                            uid,
+                            prompt,
+                            provider,
+                            repo,
+                            all: sendAll
+                        })
+                    });
+                    const data = await response.json();
+
+                    if (data.success) {
+                        const logs = data.logs || [];
+                        const lines = [];
+                        for (const entry of logs) {
+                            const status = entry.success ? 'OK' : 'ERR';
+                            const msg = entry.message || '';
+                            const url = entry.pr_url ? ' PR: ' + entry.pr_url : '';
+                            const agentUrl = entry.agent_url ? ' Agent: ' + entry.agent_url : '';
+                            lines.push('[' + entry.provider + '] ' + status + ' ' + msg + url + agentUrl);
+                        }
+                        logsEl.value = lines.join('\\n');
+                        if (!logs.length && data.message) {
+                            logsEl.value = data.message;
+                        }
+                        if (!sendAll) {
+                            const info = data.message || 'Command sent successfully';
+                            const prUrl = data.pr_url ? '\\nPR: ' + data.pr_url : '';
+                            alert(info + prUrl);
+                        }
+                    } else {
+                        logsEl.value = 'Agent test failed: ' + data.error;
+                        alert('Agent test failed: ' + data.error);
+                    }
+                } catch (error) {
+                    logsEl.value = 'Error: ' + error.message;
+                    alert('Error: ' + error.message);
+                }
+            }
+        </script>
+    </body>
+</html>
+""")
+
+# Shown after a successful OAuth exchange
+# ($uid, $github_username, $repo_count, $repo_noun), HTML/URL-escaped by the caller
+OAUTH_SUCCESS_PAGE = _page("""
+<html>
+    <head>
+        <meta name="viewport" content="width=device-width, initial-scale=1">
+        <title>Connected Successfully!</title>
+        <style>
+            $css
+        </style>
+    </head>
+    <body>
+        <div class="container">
+            <div class="success-box" style="padding: 40px 24px;">
+                <div class="icon" style="font-size: 72px;">🎉</div>
+                <h2 style="font-size: 28px; margin: 16px 0;">Successfully Connected!</h2>
+                <p style="font-size: 17px; margin: 12px 0;">
+                    Your GitHub account <strong>@$github_username</strong> is now linked
+                </p>
+                <p style="font-size: 16px; margin: 8px 0;">
+                    Found <strong>$repo_count</strong> $repo_noun
+                </p>
+            </div>
+
+            <a href="/?uid=$uid" class="btn btn-primary btn-block" style="font-size: 17px; padding: 16px; margin-top: 24px;">
+                Continue to Settings
+            </a>
+
+            <div class="card" style="margin-top: 20px; text-align: center;">
+                <h3>Ready to Go!</h3>
+                <p style="font-size: 16px; line-height: 1.8;">
+                    You can now manage GitHub issues by chatting with Omi.
+                    <br><br>
+                    Try saying:<br>
+                    <strong>"Create an issue for..."</strong> or
+                    <strong>"Show me open issues"</strong>
+                </p>
+            </div>
+        </div>
+    </body>
+</html>
+""")
+
+# Error card used by the OAuth callback
+# ($title, $detail, $action), HTML-escaped by the caller
+ERROR_PAGE = _page("""
+<html>
+    <head>
+        <meta name="viewport" content="width=device-width, initial-scale=1">
+        <style>$css</style>
+    </head>
+    <body>
+        <div class="container">
+            <div class="error-box" style="margin-top: 40px; padding: 40px 24px;">
+                <h2 style="font-size: 24px; margin-bottom: 12px;">$title</h2>
+                <p style="margin-bottom: 0;">$detail</p>$action
+            </div>
+        </div>
+    </body>
+</html>
+""")
+
+
+def render_error(title: str, detail: str, retry_href: Optional[str] = None) -> str:
+    """Fill ERROR_PAGE, escaping the text and adding a "Try again" button if retry_href is set."""
+    action = ""
+    if retry_href:
+        action = f'\n<a href="{escape(retry_href)}" class="btn btn-primary" style="margin-top: 16px;">Try again</a>'
+    return ERROR_PAGE.substitute(title=escape(title), detail=escape(detail), action=action)
+
+
+class SegmentedPage:
+    """
+    A page template pre-split into encoded literal segments.
+
+    render() only encodes the substituted values and joins them with the
+    stored byte segments, so the static bulk of the page is never
+    re-interpolated or re-encoded per request.
+    """
+
+    def __init__(self, page: Template):
+        literals = []
+        self.names = []
+        text = page.template
+        pos = 0
+        for match in page.pattern.finditer(text):
+            name = match.group("named") or match.group("braced")
+            if name is None:
+                continue  # "$$" escapes stay part of the literal
+            literals.append(text[pos:match.start()].replace("$$", "$"))
+            self.names.append(name)
+            pos = match.end()
+        literals.append(text[pos:].replace("$$", "$"))
+        self.literals = [literal.encode("utf-8") for literal in literals]
+
+    def render(self, **values: str) -> bytes:
+        encoded = {name: value.encode("utf-8") for name, value in values.items()}
+        parts = [self.literals[0]]
+        for name, literal in zip(self.names, self.literals[1:]):
+            parts.append(encoded[name])
+            parts.append(literal)
+        return b"".join(parts)
+
+
+# The landing page only varies by its auth link
+UNAUTH = SegmentedPage(UNAUTH_PAGE)
+# Version of the landing page markup; its ETag combines this with the uid
+UNAUTH_VERSION = hashlib.sha256(b"".join(UNAUTH.literals)).hexdigest()[:16]
+# Settings: ~20 KB of markup and script around a handful of user values
+SETTINGS = SegmentedPage(SETTINGS_PAGE)
+
+# Callback errors with no per-request data, rendered and encoded once
+MISSING_CODE_PAGE = render_error(
+    "Authentication Failed",
+    "Authorization code not received. Please try again."
+).encode("utf-8")
+STATE_MISMATCH_PAGE = render_error(
+    "Invalid State",
+    "OAuth state mismatch. Please try again."
+).encode("utf-8")
+
+# gzip bodies for the static error pages, compressed once at the highest level
+MISSING_CODE_PAGE_GZ = gzip.compress(MISSING_CODE_PAGE, 9)
+STATE_MISMATCH_PAGE_GZ = gzip.compress(STATE_MISMATCH_PAGE, 9)
@@ -2,8 +2,10 @@
 Simple storage with file persistence - survives server restarts!
 Stores user OAuth tokens and selected repositories.
 """
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Optional
 from datetime import datetime
+import asyncio
 import json
 import os
 
@@ -22,6 +24,10 @@ USERS_FILE = os.path.join(STORAGE_DIR, "users_data.json")
 # In-memory storage
 users: Dict[str, dict] = {}
 
+# One writer thread keeps file writes ordered; _save_scheduled coalesces saves
+_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="users-writer")
+_save_scheduled = False
+
 
 def load_storage():
     """Load user data from file on startup."""
@@ -35,13 +41,55 @@ def load_storage():
         print(f"Could not load users: {e}")
 
 
-def save_users():
-    """Save user data to file."""
+def _write_users_file(data: str):
+    """Write the serialized users atomically (temp file + rename)."""
+    try:
+        tmp_file = f"{USERS_FILE}.tmp"
+        with open(tmp_file, 'w') as f:
+            f.write(data)
+        os.replace(tmp_file, USERS_FILE)
+    except Exception as e:
+        print(f"Could not save users: {e}")
+
+
+def _flush_users():
+    """Snapshot users on the loop thread and hand the file write to the writer thread."""
+    global _save_scheduled
+    _save_scheduled = False
     try:
-        with open(USERS_FILE, 'w') as f:
-            json.dump(users, f, default=str, indent=2)
+        data = json.dumps(users, default=str, indent=2)
     except Exception as e:
         print(f"Could not save users: {e}")
+        return
+    _writer.submit(_write_users_file, data)
+
+
+def save_users():
+    """
+    Save user data to file.
+
+    Inside the event loop the write is deferred: saves made in the same loop
+    iteration collapse into one, and the disk write happens on a single
+    background thread (so writes stay in order). The in-memory dict is always
+    current, so reads never wait on it.
+    """
+    global _save_scheduled
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        _write_users_file(json.dumps(users, default=str, indent=2))
+        return
+
+    if not _save_scheduled:
+        _save_scheduled = True
+        loop.call_soon(_flush_users)
+
+
+def shutdown_storage():
+    """Write out a save still queued on the loop and wait for pending file writes."""
+    if _save_scheduled:
+        _flush_users()
+    _writer.shutdown(wait=True)
 
 
 # Load on module import
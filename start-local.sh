@@ -91,5 +91,5 @@ echo "========================================"
 echo ""
 
 # Run the app
-python main.py
+APP_RELOAD=1 python main.py
 